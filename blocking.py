@@ -0,0 +1,64 @@
+import fnmatch
+
+import config
+
+
+class RequestBlocker:
+    """Abort requests the results feed does not need and count what was saved"""
+
+    def __init__(self, profile_name):
+        if profile_name not in config.BLOCK_PROFILES:
+            raise ValueError(f"Unknown block profile: {profile_name}")
+        profile = config.BLOCK_PROFILES[profile_name]
+        self.profile_name = profile_name
+        self.resource_types = set(profile.get("resource_types", []))
+        self.url_patterns = list(profile.get("url_patterns", []))
+        self.requests_allowed = 0
+        self.requests_blocked = 0
+        self.bytes_allowed = 0
+        self.blocked_by_type = {}
+
+    @property
+    def enabled(self):
+        return bool(self.resource_types or self.url_patterns)
+
+    def should_block(self, url, resource_type):
+        """Return True if a request matches the profile"""
+        if resource_type in self.resource_types:
+            return True
+        return any(fnmatch.fnmatch(url, pattern) for pattern in self.url_patterns)
+
+    async def install(self, context):
+        """Route every request of the context through the profile"""
+        # Byte counting works for every profile, including "off"
+        context.on("requestfinished", self._on_finished)
+        if self.enabled:
+            # Note: routing disables Chromium's HTTP cache for the context
+            await context.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.requests_blocked += 1
+            self.blocked_by_type[request.resource_type] = self.blocked_by_type.get(request.resource_type, 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _on_finished(self, request):
+        self.requests_allowed += 1
+        try:
+            sizes = await request.sizes()
+            self.bytes_allowed += sizes["responseHeadersSize"] + sizes["responseBodySize"]
+        except Exception:
+            pass
+
+    def summary(self, results=0):
+        """Return a one-line report of the session's network volume"""
+        line = (f"Block profile '{self.profile_name}': {self.requests_allowed} requests allowed "
+                f"({self.bytes_allowed / 1_048_576:.1f} MB), {self.requests_blocked} blocked")
+        if self.blocked_by_type:
+            line += " [" + ", ".join(f"{kind}: {count}" for kind, count in sorted(self.blocked_by_type.items())) + "]"
+        if results:
+            line += f" - {self.bytes_allowed / 1_048_576 * 100 / results:.1f} MB per 100 results"
+        return line
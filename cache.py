@@ -0,0 +1,100 @@
+import json
+import re
+import sqlite3
+import time
+
+FEATURE_ID_RE = re.compile(r"!1s(0x[0-9a-f]+:0x[0-9a-f]+)", re.IGNORECASE)
+PLACE_ID_RE = re.compile(r"place_id:([A-Za-z0-9_-]+)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS places (
+    key TEXT PRIMARY KEY,
+    details TEXT,
+    fetched_at REAL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS places_accessed_at ON places (accessed_at);
+"""
+
+
+def place_key(url):
+    """Canonical identity of a place: its feature id, else its place id, else the URL path"""
+    if not url or url == "N/A":
+        return None
+    match = FEATURE_ID_RE.search(url) or PLACE_ID_RE.search(url)
+    if match:
+        return match.group(1)
+    return url.split("?")[0]
+
+
+class PlaceCache:
+    """On-disk cache of place-detail results with a TTL and least-recently-used eviction"""
+
+    def __init__(self, path, ttl_seconds, max_entries):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        self.size = self.conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return cached details for a place, or None if missing or older than the TTL"""
+        if key is None:
+            return None
+        row = self.conn.execute("SELECT details, fetched_at FROM places WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self.misses += 1
+            return None
+        if now - row[1] > self.ttl_seconds:
+            self.stale += 1
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE places SET accessed_at = ? WHERE key = ?", (now, key))
+        self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, details):
+        """Store fresh details for a place, evicting the least recently used entries past max_entries"""
+        if key is None:
+            return
+        now = time.time()
+        exists = self.conn.execute("SELECT 1 FROM places WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO places (key, details, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(details, ensure_ascii=False), now, now),
+        )
+        if not exists:
+            self.size += 1
+        if self.size > self.max_entries:
+            self._evict(self.size - self.max_entries)
+        self.conn.commit()
+
+    def _evict(self, count):
+        # Expired entries go first, then the least recently used ones
+        deleted = self.conn.execute(
+            "DELETE FROM places WHERE fetched_at < ?", (time.time() - self.ttl_seconds,)
+        ).rowcount
+        if deleted < count:
+            deleted += self.conn.execute(
+                "DELETE FROM places WHERE key IN (SELECT key FROM places ORDER BY accessed_at LIMIT ?)",
+                (count - deleted,),
+            ).rowcount
+        self.evictions += deleted
+        self.size -= deleted
+
+    def summary(self):
+        return (f"Place cache: {self.hits} hits, {self.misses} misses ({self.stale} stale), "
+                f"{self.evictions} evicted, {self.size} entries")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,264 @@
+import json
+import math
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from cache import place_key
+
+# Words that say nothing about which business it is
+NAME_STOPWORDS = {
+    "the", "and", "of", "sdn", "bhd", "berhad", "plt", "inc", "llc", "ltd", "limited",
+    "co", "corp", "corporation", "company", "pte", "gmbh", "enterprise",
+}
+
+# Common address spellings folded to one form
+ADDRESS_ABBREVIATIONS = {
+    "jalan": "jln", "street": "st", "road": "rd", "avenue": "ave", "boulevard": "blvd",
+    "lorong": "lrg", "taman": "tmn", "persiaran": "psn", "suite": "ste", "floor": "fl",
+    "level": "lvl", "building": "bldg", "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Candidates compared per record, so a hot block key cannot make a lookup linear
+MAX_CANDIDATES = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dedup_blocks (
+    block_key TEXT,
+    record_id INTEGER,
+    PRIMARY KEY (block_key, record_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dedup_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    last_indexed_id INTEGER
+);
+"""
+
+
+def _fold(text):
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+def normalize_name(name):
+    if not name or name == "N/A":
+        return ""
+    return " ".join(word for word in _fold(name).split() if word not in NAME_STOPWORDS)
+
+
+def normalize_address(address):
+    if not address or address == "N/A":
+        return ""
+    return " ".join(ADDRESS_ABBREVIATIONS.get(word, word) for word in _fold(address).split())
+
+
+def normalize_phone(phone):
+    """Digits only, keeping the last 9 so +60 3-1234 5678 and 03-1234 5678 match"""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-9:] if len(digits) >= 7 else ""
+
+
+def _coordinate(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+
+def geohash(lat, lng, precision=6):
+    """Standard geohash of a point (precision 6 is roughly 1.2 km x 0.6 km)"""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def distance_m(a, b):
+    """Approximate distance in metres between two (lat, lng) points"""
+    lat = math.radians((a[0] + b[0]) / 2)
+    dx = math.radians(b[1] - a[1]) * math.cos(lat)
+    dy = math.radians(b[0] - a[0])
+    return 6371000 * math.hypot(dx, dy)
+
+
+def signature(record):
+    """Normalized identity of an output record"""
+    lat, lng = _coordinate(record.get("Latitude")), _coordinate(record.get("Longitude"))
+    return {
+        "name": normalize_name(record.get("Business name")),
+        "address": normalize_address(record.get("Full address")),
+        "phone": normalize_phone(record.get("Phone number (if available)")),
+        "place_key": place_key(record.get("Place URL")),
+        "point": (lat, lng) if lat is not None and lng is not None else None,
+    }
+
+
+def exact_keys(record):
+    """(name_address_key, place_key) stored as unique columns on the record
+
+    With a place id the unique key is the id itself, so two branches sharing a
+    name and an unparsed address are not collapsed by the constraint;
+    DedupIndex decides those.
+    """
+    sig = signature(record)
+    if sig["place_key"]:
+        return f"pk:{sig['place_key']}", sig["place_key"]
+    return f"{sig['name']}|{sig['address']}", sig["place_key"]
+
+
+def block_keys(sig):
+    """Keys that put likely duplicates in the same bucket"""
+    keys = []
+    if sig["phone"]:
+        keys.append(f"ph:{sig['phone']}")
+    if sig["name"]:
+        keys.append(f"nm:{sig['name']}")
+        if sig["point"]:
+            cell = geohash(*sig["point"])
+            tokens = [token for token in sig["name"].split() if len(token) >= 3][:3]
+            keys.extend(f"gh:{cell}:{token}" for token in tokens)
+    return keys
+
+
+def compare(sig, other):
+    """Return (reason, score) if two signatures are the same business, else None"""
+    if sig["place_key"] and sig["place_key"] == other["place_key"]:
+        return "place id", 1.0
+    if sig["place_key"] and other["place_key"] and sig["place_key"][:2] == other["place_key"][:2]:
+        # Two different ids of the same kind are two different places (e.g. chain branches)
+        return None
+
+    name_score = SequenceMatcher(None, sig["name"], other["name"]).ratio()
+    if sig["phone"] and sig["phone"] == other["phone"] and name_score >= 0.75:
+        return "phone + name", name_score
+
+    if name_score < 0.9:
+        return None
+    if sig["point"] and other["point"] and distance_m(sig["point"], other["point"]) <= 100:
+        return "name + location", name_score
+    if sig["address"] and other["address"]:
+        address_score = SequenceMatcher(None, sig["address"], other["address"]).ratio()
+        if address_score >= 0.85:
+            return "name + address", min(name_score, address_score)
+    elif not sig["address"] and not other["address"] and name_score >= 0.97:
+        return "name (no address)", name_score
+    return None
+
+
+# Record columns read back from the store for comparison
+ROW_COLUMNS = "id, name, address, phone, place_url, latitude, longitude"
+
+
+def _row_signature(row):
+    return signature({
+        "Business name": row[1], "Full address": row[2], "Phone number (if available)": row[3],
+        "Place URL": row[4], "Latitude": row[5], "Longitude": row[6],
+    })
+
+
+class DedupIndex:
+    """Blocking index over the record store that finds exact and near duplicates"""
+
+    def __init__(self, conn, log_path=None):
+        self.conn = conn
+        self.log_path = log_path
+        self.conn.executescript(SCHEMA)
+        self.decisions = {}
+        self.last_decision = None
+
+    def find_duplicate(self, record):
+        """Return (record_id, reason, score) of a stored duplicate, or None"""
+        sig = signature(record)
+        if sig["place_key"]:
+            row = self.conn.execute("SELECT id FROM records WHERE place_key = ?", (sig["place_key"],)).fetchone()
+            if row:
+                return row[0], "place id", 1.0
+
+        keys = block_keys(sig)
+        if not keys:
+            return None
+        candidates = self.conn.execute(
+            f"SELECT DISTINCT record_id FROM dedup_blocks WHERE block_key IN ({', '.join('?' for _ in keys)}) LIMIT ?",
+            keys + [MAX_CANDIDATES],
+        ).fetchall()
+        if not candidates:
+            return None
+
+        ids = [row[0] for row in candidates]
+        rows = self.conn.execute(
+            f"SELECT {ROW_COLUMNS} FROM records WHERE id IN ({', '.join('?' for _ in ids)})",
+            ids,
+        ).fetchall()
+        for row in rows:
+            match = compare(sig, _row_signature(row))
+            if match:
+                return row[0], match[0], match[1]
+        return None
+
+    def index_new_records(self):
+        """Add block keys for every record stored since the last call"""
+        state = self.conn.execute("SELECT last_indexed_id FROM dedup_state WHERE id = 1").fetchone()
+        last_id = state[0] if state else 0
+        rows = self.conn.execute(
+            f"SELECT {ROW_COLUMNS} FROM records WHERE id > ? ORDER BY id",
+            (last_id,),
+        ).fetchall()
+        if not rows:
+            return 0
+
+        entries = []
+        for row in rows:
+            sig = _row_signature(row)
+            entries.extend((key, row[0]) for key in block_keys(sig))
+        self.conn.executemany("INSERT OR IGNORE INTO dedup_blocks (block_key, record_id) VALUES (?, ?)", entries)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO dedup_state (id, last_indexed_id) VALUES (1, ?)", (rows[-1][0],)
+        )
+        return len(rows)
+
+    def reindex(self, record_id):
+        """Replace a record's block keys with those of its current fields (e.g. after enrichment)"""
+        self.conn.execute("DELETE FROM dedup_blocks WHERE record_id = ?", (record_id,))
+        row = self.conn.execute(f"SELECT {ROW_COLUMNS} FROM records WHERE id = ?", (record_id,)).fetchone()
+        if row:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO dedup_blocks (block_key, record_id) VALUES (?, ?)",
+                [(key, record_id) for key in block_keys(_row_signature(row))],
+            )
+
+    def report(self, record, match):
+        """Count a duplicate decision and append it to the decision log"""
+        record_id, reason, score = match
+        self.last_decision = match
+        self.decisions[reason] = self.decisions.get(reason, 0) + 1
+        if self.log_path:
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "name": record.get("Business name"),
+                    "address": record.get("Full address"),
+                    "duplicate_of": record_id,
+                    "reason": reason,
+                    "score": round(score, 3),
+                }, ensure_ascii=False) + "\n")
+
+    def summary(self):
+        if not self.decisions:
+            return "Dedup: no duplicates found"
+        return "Dedup: " + ", ".join(f"{count} by {reason}" for reason, count in sorted(self.decisions.items()))
@@ -0,0 +1,201 @@
+import asyncio
+import re
+import time
+
+from cache import place_key
+from sessions import BLOCKED, FAILED, OK
+
+# JavaScript run on a place detail page: reads the fields the result card lacks,
+# plus rating, review count and closed status for refreshes
+DETAIL_JS = """
+() => {
+    const text = (el) => (el && el.innerText ? el.innerText.trim() : null);
+    const phone = document.querySelector('button[data-item-id^="phone:tel:"]');
+    const website = document.querySelector('a[data-item-id="authority"]');
+    const hours = document.querySelector('div.t39EBf[aria-label], div[aria-label*="open hours" i]');
+    const hourRows = Array.from(document.querySelectorAll("table.eK4R0e tr, table.WgFkxc tr"))
+        .map((row) => text(row).replace(/\\s+/g, " "))
+        .filter(Boolean);
+    const rating = document.querySelector('div.F7nice span[aria-hidden="true"]');
+    const reviews = document.querySelector('div.F7nice span[aria-label*="review" i]');
+    const header = text(document.querySelector("div.TIHn2, div.lMbq3e")) || "";
+    const status = header.match(/permanently closed|temporarily closed/i);
+    return {
+        phone: phone ? (phone.getAttribute("data-item-id").replace("phone:tel:", "") || text(phone)) : null,
+        website: website ? website.getAttribute("href") : null,
+        hours: hourRows.length ? hourRows.join("; ") : (hours ? hours.getAttribute("aria-label") : null),
+        rating: text(rating),
+        reviews: reviews ? (reviews.getAttribute("aria-label") || text(reviews)) : null,
+        status: status ? status[0][0].toUpperCase() + status[0].slice(1).toLowerCase() : null,
+        url: location.href,
+    };
+}
+"""
+
+COORDINATES_RE = re.compile(r"!3d(-?\d+\.\d+)!4d(-?\d+\.\d+)")
+VIEWPORT_RE = re.compile(r"@(-?\d+\.\d+),(-?\d+\.\d+)")
+
+
+def coordinates_from_url(url):
+    """Return (latitude, longitude) encoded in a Maps place URL, or None"""
+    if not url:
+        return None
+    match = COORDINATES_RE.search(url) or VIEWPORT_RE.search(url)
+    return (float(match.group(1)), float(match.group(2))) if match else None
+
+
+def merge_details(record, details):
+    """Fill the record's missing fields from a detail-page result; return the names filled"""
+    filled = []
+    coordinates = coordinates_from_url(details.get("url"))
+    updates = {
+        "Phone number (if available)": details.get("phone"),
+        "Website URL": details.get("website"),
+        "Opening hours": details.get("hours"),
+        "Latitude": coordinates[0] if coordinates else None,
+        "Longitude": coordinates[1] if coordinates else None,
+    }
+    for column, value in updates.items():
+        if value not in (None, "") and record.get(column) in (None, "", "N/A"):
+            record[column] = value
+            filled.append(column)
+    return filled
+
+
+def cache_url(url, details):
+    """URL to cache a detail result under: a name search is cached as the place it opened, if any"""
+    if "/maps/search/" not in url:
+        return url
+    resolved = details.get("url") or ""
+    return resolved if "/maps/place/" in resolved else None
+
+
+class EnrichmentPool:
+    """Open place detail pages on a bounded number of workers and merge the extra fields
+
+    Every page load leases a session from the SessionPool and reports how it went,
+    so a captcha cools that session down like it does for a search; each worker
+    keeps one page per session it has used.
+
+    merge(record, details) applies a page's result to its record; its return value
+    (the fields it changed) is passed to on_done(record_id, record, result), and
+    result is None when the page could not be read.
+    """
+
+    def __init__(self, session_pool, on_done, workers=2, min_interval=1.0, timeout=15000, cache=None,
+                 merge=merge_details, label="Enriched", max_pending=None):
+        self.session_pool = session_pool
+        self.on_done = on_done
+        self.merge = merge
+        self.label = label
+        self.cache = cache
+        self.workers = workers
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self.queue = asyncio.Queue()
+        self.pending = {}
+        self._room = asyncio.Event()
+        self.enriched = 0
+        self.failed = 0
+        self._tasks = []
+        self._pages = []
+        self._rate_lock = asyncio.Lock()
+        self._last_open = 0.0
+
+    async def start(self):
+        """Start the workers consuming the queue (pages open on their first lease of a session)"""
+        for _ in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker()))
+
+    def submit(self, record_id, record):
+        """Queue a record whose "Place URL" should be visited"""
+        self.pending[record_id] = record
+        self.queue.put_nowait(record_id)
+
+    async def wait_for_room(self):
+        """Wait while max_pending records are queued, so the backlog (kept in memory) stays bounded"""
+        while self.max_pending and len(self.pending) >= self.max_pending:
+            self._room.clear()
+            await self._room.wait()
+
+    def pending_records(self):
+        """Records still waiting for enrichment (written as-is on an abrupt exit)"""
+        return list(self.pending.items())
+
+    async def _wait_turn(self):
+        # Spaces detail-page loads across all workers
+        async with self._rate_lock:
+            wait = self._last_open + self.min_interval - time.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_open = time.time()
+
+    async def _page_on(self, pages, session):
+        page = pages.get(session.name)
+        if page is None or page.is_closed():
+            page = await session.context.new_page()
+            page.set_default_timeout(self.timeout)
+            pages[session.name] = page
+            self._pages.append(page)
+        return page
+
+    async def _worker(self):
+        pages = {}  # session name -> this worker's page on it
+        while True:
+            record_id = await self.queue.get()
+            record = self.pending.get(record_id)
+            result = None
+            session = None
+            outcome = FAILED
+            try:
+                session = await self.session_pool.lease()
+                page = await self._page_on(pages, session)
+                await self._wait_turn()
+                await page.goto(record["Place URL"], wait_until="domcontentloaded")
+                if "/sorry/" in page.url:
+                    outcome = BLOCKED
+                    raise Exception("Blocked by a captcha page")
+                await page.wait_for_selector("h1", timeout=self.timeout)
+                details = await page.evaluate(DETAIL_JS)
+                outcome = OK
+                if self.cache:
+                    self.cache.put(place_key(cache_url(record["Place URL"], details)), details)
+                result = self.merge(record, details)
+                self.enriched += 1
+                if result:
+                    print(f"🔎 {self.label} {record['Business name']}: {', '.join(result)}")
+            except Exception as e:
+                self.failed += 1
+                print(f"Could not read the place page of {record['Business name']}: {e}")
+            finally:
+                if session:
+                    await self.session_pool.release(session, outcome)
+                self.pending.pop(record_id, None)
+                self._room.set()
+                try:
+                    self.on_done(record_id, record, result)
+                except Exception as e:
+                    print(f"Error saving enriched record: {e}")
+                self.queue.task_done()
+
+    async def wait(self):
+        """Wait until every submitted record is done"""
+        await self.queue.join()
+
+    async def close(self):
+        """Finish the queued records, then stop the workers and close their pages"""
+        await self.wait()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for page in self._pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._tasks = []
+        self._pages = []
+
+    def summary(self):
+        return f"Enrichment: {self.enriched} detail pages read, {self.failed} failed, {self.queue.qsize()} left"
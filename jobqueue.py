@@ -0,0 +1,144 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE,
+    job TEXT,
+    state TEXT DEFAULT 'queued',
+    worker TEXT,
+    lease_until REAL,
+    heartbeat_at REAL,
+    attempts INTEGER DEFAULT 0,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+"""
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    """Jobs shared by several scraper processes on one host through one SQLite file
+
+    A worker claims a job with a lease; a job whose lease runs out without a
+    heartbeat (its worker died) is handed to the next claimant. Every state
+    change is a short BEGIN IMMEDIATE transaction, so claims never race.
+    """
+
+    def __init__(self, path, lease_seconds=120, max_attempts=3, worker_id=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.worker_id = worker_id or default_worker_id()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # WAL needs shared memory: the file must be on a local disk, not a network share
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def _transaction(self, work):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+            self.conn.execute("COMMIT")
+            return result
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def enqueue(self, jobs):
+        """Queue jobs (plain dicts with a "key") unless a job with the same key exists; return how many were new"""
+        now = time.time()
+
+        def work():
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (key, job, updated_at) VALUES (?, ?, ?)",
+                [(job["key"], json.dumps(job), now) for job in jobs],
+            )
+            return self.conn.total_changes - before
+        return self._transaction(work)
+
+    def claim(self):
+        """Lease the next queued (or abandoned) job to this worker; return its dict or None
+
+        An abandoned job that already used max_attempts claims is marked failed instead.
+        """
+        now = time.time()
+
+        def work():
+            # A job whose worker died on every attempt (e.g. it crashes the browser) is not handed out again
+            expired = self.conn.execute(
+                "UPDATE jobs SET state = 'failed', lease_until = NULL, updated_at = ? "
+                "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts),
+            ).rowcount
+            if expired:
+                print(f"❌ {expired} job(s) failed: lease expired after {self.max_attempts} attempts")
+            row = self.conn.execute(
+                "SELECT id, job, state, worker FROM jobs "
+                "WHERE state = 'queued' OR (state = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[2] == "leased":
+                print(f"♻️  Reclaiming job from {row[3]} (lease expired)")
+            self.conn.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, lease_until = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (self.worker_id, now + self.lease_seconds, now, now, row[0]),
+            )
+            return json.loads(row[1])
+        return self._transaction(work)
+
+    def heartbeat(self, key):
+        """Extend this worker's lease on a job; False if the lease was lost to another worker"""
+        now = time.time()
+        updated = self.conn.execute(
+            "UPDATE jobs SET lease_until = ?, heartbeat_at = ? WHERE key = ? AND worker = ? AND state = 'leased'",
+            (now + self.lease_seconds, now, key, self.worker_id),
+        ).rowcount
+        return updated == 1
+
+    def finish(self, key, ok):
+        """Mark a leased job done, or re-queue it after a failure until max_attempts is used up"""
+        now = time.time()
+
+        def work():
+            row = self.conn.execute(
+                "SELECT attempts FROM jobs WHERE key = ? AND worker = ? AND state = 'leased'", (key, self.worker_id)
+            ).fetchone()
+            if row is None:
+                return None  # lease lost; the new owner reports the outcome
+            if ok:
+                state = "done"
+            else:
+                state = "failed" if row[0] >= self.max_attempts else "queued"
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL, updated_at = ? WHERE key = ?", (state, now, key)
+            )
+            return state
+        return self._transaction(work)
+
+    def active(self):
+        """True while any job is queued or leased (running jobs may still queue more)"""
+        row = self.conn.execute("SELECT 1 FROM jobs WHERE state IN ('queued', 'leased') LIMIT 1").fetchone()
+        return row is not None
+
+    def counts(self):
+        return dict(self.conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state").fetchall())
+
+    def summary(self):
+        counts = self.counts()
+        return "Job queue: " + ", ".join(f"{counts.get(state, 0)} {state}" for state in ("done", "failed", "leased", "queued"))
+
+    def close(self):
+        self.conn.close()
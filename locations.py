@@ -0,0 +1,91 @@
+import csv
+import re
+import unicodedata
+from collections import deque
+
+
+def fold(text):
+    """Lowercase, strip accents and collapse punctuation to single spaces, padded on both ends"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char)).lower()
+    return f" {re.sub(r'[^a-z0-9]+', ' ', text).strip()} "
+
+
+class Gazetteer:
+    """Localities matched against an address in one Aho-Corasick pass
+
+    Patterns are folded and padded with spaces, so they only match whole words:
+    "KL" matches "Jalan Ampang, KL" but not "Klang".
+    """
+
+    def __init__(self, entries):
+        # entries: (location, [names, aliases and postcodes]); earlier entries win ties
+        self.locations = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for rank, (location, patterns) in enumerate(entries):
+            self.locations.append(location)
+            for pattern in patterns:
+                folded = fold(pattern)
+                if folded.strip():
+                    self._add(folded, rank)
+        self._link()
+
+    @classmethod
+    def load(cls, path):
+        """Read a gazetteer CSV: location, aliases and postcodes ("|"-separated); "#" rows are comments"""
+        entries = []
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(line for line in f if not line.startswith("#")):
+                location = (row.get("location") or "").strip()
+                if not location:
+                    continue
+                patterns = [location]
+                for column in ("aliases", "postcodes"):
+                    patterns.extend(value.strip() for value in (row.get(column) or "").split("|") if value.strip())
+                entries.append((location, patterns))
+        return cls(entries)
+
+    def _add(self, pattern, rank):
+        state = 0
+        for char in pattern:
+            if char not in self._goto[state]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][char] = len(self._goto) - 1
+            state = self._goto[state][char]
+        self._out[state].append((len(pattern), rank))
+
+    def _link(self):
+        # Breadth-first failure links; each state inherits the outputs of its fallback
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def _scan(self, text):
+        state = 0
+        for end, char in enumerate(fold(text), 1):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, rank in self._out[state]:
+                yield end - length, end, rank
+
+    def matches(self, text):
+        """Yield (start, end, location) for every locality named in the (folded) text"""
+        for start, end, rank in self._scan(text):
+            yield start, end, self.locations[rank]
+
+    def resolve(self, text, default="N/A"):
+        """Return the location for an address: earliest gazetteer entry wins, then the longest match"""
+        best = min(((rank, start - end) for start, end, rank in self._scan(text)), default=None)
+        return self.locations[best[0]] if best else default
@@ -0,0 +1,201 @@
+import json
+import os
+import sys
+
+# Google Maps prefixes its JSON responses with this anti-XSSI guard
+XSSI_PREFIX = ")]}'"
+
+# Positions of each field inside a listing's place array. The payload format is
+# undocumented, so each field lists the paths seen so far, tried in order.
+FIELD_PATHS = {
+    "name": [(11,)],
+    "categories": [(13,)],
+    "address": [(39,), (2,)],
+    "phone": [(178, 0, 0), (3, 0)],
+    "url": [(7, 0)],
+    "rating": [(4, 7)],
+    "reviews": [(4, 8)],
+    "latitude": [(9, 2)],
+    "longitude": [(9, 3)],
+    "key": [(10,)],
+    "place_id": [(78,)],
+}
+
+
+# Response bodies with the records they must decode to (<name>.txt + <name>.expected.json).
+# Add real ones captured with CAPTURE_RESPONSES_DIR; synthetic_search.txt is hand-built.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures")
+
+
+class PayloadMismatch(ValueError):
+    """A response body did not decode to its expected records"""
+
+
+def is_search_response(url):
+    """Return True if a response URL carries Maps search listings"""
+    return "/search?" in url and "tbm=map" in url
+
+
+def strip_xssi(text):
+    """Remove the anti-XSSI prefix (and the first line it sits on) from a payload"""
+    text = text.lstrip()
+    if text.startswith(XSSI_PREFIX):
+        newline = text.find("\n")
+        return text[newline + 1:] if newline != -1 else ""
+    return text
+
+
+def decode_payload(text):
+    """Decode a raw search response body into its nested JSON array"""
+    text = text.strip()
+    if text.endswith('/*""*/'):
+        text = text[:-len('/*""*/')]
+
+    if text.lstrip().startswith("{"):
+        # The XHR wraps the real payload as a string in the "d" field
+        outer = json.loads(text)
+        text = outer.get("d", "")
+
+    text = strip_xssi(text)
+    return json.loads(text) if text else None
+
+
+def dig(node, path):
+    """Follow a path of list indices, returning None if any step is missing"""
+    for index in path:
+        if not isinstance(node, list) or index >= len(node):
+            return None
+        node = node[index]
+    return node
+
+
+def first_field(place, name):
+    """Return the first non-empty value found for a field"""
+    for path in FIELD_PATHS[name]:
+        value = dig(place, path)
+        if value not in (None, "", []):
+            return value
+    return None
+
+
+def iter_places(payload):
+    """Yield the place array of every listing in a decoded payload"""
+    listings = dig(payload, (0, 1))
+    if not isinstance(listings, list):
+        return
+    for listing in listings:
+        place = dig(listing, (14,))
+        if isinstance(place, list):
+            yield place
+
+
+def parse_place(place):
+    """Convert a place array into the business fields used by add_item"""
+    name = first_field(place, "name")
+    if not isinstance(name, str):
+        return None
+
+    categories = first_field(place, "categories")
+    category = categories[0] if isinstance(categories, list) and categories else "N/A"
+
+    address = first_field(place, "address")
+    if isinstance(address, list):
+        address = ", ".join(part for part in address if isinstance(part, str))
+
+    rating = first_field(place, "rating")
+    reviews = first_field(place, "reviews")
+    phone = first_field(place, "phone")
+    url = first_field(place, "url")
+    key = first_field(place, "key")
+
+    return {
+        "key": key if isinstance(key, str) else name,
+        "name": name,
+        "category": category if isinstance(category, str) else "N/A",
+        "address": address or "N/A",
+        "phone": phone if isinstance(phone, str) else "N/A",
+        "url": url if isinstance(url, str) else "N/A",
+        "rating": str(rating) if isinstance(rating, (int, float)) else "N/A",
+        "reviews": f"{reviews:,}" if isinstance(reviews, int) else "N/A",
+        "latitude": first_field(place, "latitude"),
+        "longitude": first_field(place, "longitude"),
+        "place_id": first_field(place, "place_id"),
+    }
+
+
+def parse_search_payload(text):
+    """Parse a raw search response body into a list of business records"""
+    try:
+        payload = decode_payload(text)
+    except (ValueError, TypeError):
+        return []
+
+    records = []
+    for place in iter_places(payload):
+        record = parse_place(place)
+        if record:
+            records.append(record)
+    return records
+
+
+def expected_path(path):
+    return os.path.splitext(path)[0] + ".expected.json"
+
+
+def fixtures():
+    """Response bodies in FIXTURES_DIR that have an expected-records file"""
+    if not os.path.isdir(FIXTURES_DIR):
+        return []
+    paths = sorted(os.path.join(FIXTURES_DIR, name) for name in os.listdir(FIXTURES_DIR) if name.endswith(".txt"))
+    return [path for path in paths if os.path.exists(expected_path(path))]
+
+
+def check(path):
+    """Decode a response body and compare it with its .expected.json records; raise PayloadMismatch if they differ"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    with open(expected_path(path), encoding="utf-8") as f:
+        expected = json.load(f)
+
+    records = parse_search_payload(text)
+    if len(records) != len(expected):
+        raise PayloadMismatch(f"{path}: {len(records)} records, expected {len(expected)}")
+    for record, wanted in zip(records, expected):
+        for field, value in wanted.items():
+            if record.get(field) != value:
+                raise PayloadMismatch(f"{path}: {wanted['name']} {field} = {record.get(field)!r}, expected {value!r}")
+
+    # The inner payload alone (no "d" wrapper or suffix) decodes the same way
+    stripped = text.strip()
+    if stripped.endswith('/*""*/'):
+        stripped = stripped[:-len('/*""*/')]
+    if stripped.startswith("{") and parse_search_payload(json.loads(stripped)["d"]) != records:
+        raise PayloadMismatch(f"{path}: inner payload decodes differently")
+    return records
+
+
+if __name__ == "__main__":
+    # Check the parser against the fixtures: python maps_payload.py --check [response.txt ...]
+    if sys.argv[1:2] == ["--check"]:
+        for path in sys.argv[2:] or fixtures():
+            print(f"✅ {path}: {len(check(path))} records as expected")
+        sys.exit(0)
+
+    # Draft the expected records of a new capture (review them before committing):
+    # python maps_payload.py --expect tests/fixtures/<name>.txt
+    if sys.argv[1:2] == ["--expect"]:
+        for path in sys.argv[2:]:
+            records = parse_search_payload(open(path, encoding="utf-8").read())
+            with open(expected_path(path), "w", encoding="utf-8") as f:
+                json.dump(records, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            print(f"{expected_path(path)}: {len(records)} records - check every value by hand")
+        sys.exit(0)
+
+    # Parse captured response bodies offline: python maps_payload.py response.txt ...
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            records = parse_search_payload(f.read())
+        print(f"{path}: {len(records)} records")
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implied
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+# Buckets for histograms of counts (e.g. cards per batch) rather than seconds
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+PREFIX = "gmaps_"
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{str(value)}"' for name, value in pairs) + "}"
+
+
+class Histogram:
+    """Count, sum, min/max and bucket counts of observed values"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th quantile (an estimate)"""
+        if not self.count:
+            return None
+        target, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Metrics:
+    """Counters, gauges and timing histograms for one run, exported as JSON or Prometheus text"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.collectors = []
+
+    def inc(self, name, amount=1, **labels):
+        key = _key(name, labels)
+        self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, value, **labels):
+        self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, buckets=None, **labels):
+        """Add a value to a histogram; `buckets` (default: seconds) applies when it is first created"""
+        key = _key(name, labels)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram(buckets or self.buckets)
+        self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, stage):
+        """Time a block (sync or inside a coroutine) into the stage_seconds histogram"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def add_collector(self, collect):
+        """Register a callable that refreshes gauges right before every export"""
+        self.collectors.append(collect)
+
+    def _collect(self):
+        for collect in self.collectors:
+            try:
+                collect(self)
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        self.gauge("uptime_seconds", round(time.time() - self.started, 3))
+
+    def snapshot(self):
+        """All metrics as plain data"""
+        self._collect()
+
+        def name_of(key):
+            name, labels = key
+            return name + _label_text(labels)
+
+        return {
+            "started_at": self.started,
+            "counters": {name_of(key): value for key, value in sorted(self.counters.items())},
+            "gauges": {name_of(key): value for key, value in sorted(self.gauges.items())},
+            "histograms": {name_of(key): h.to_dict() for key, h in sorted(self.histograms.items())},
+        }
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        self._collect()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(f"{PREFIX}{name}_total", "counter")
+            lines.append(f"{PREFIX}{name}_total{_label_text(labels)} {value}")
+        for (name, labels), value in sorted(self.gauges.items()):
+            header(f"{PREFIX}{name}", "gauge")
+            lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+        for (name, labels), h in sorted(self.histograms.items()):
+            metric = f"{PREFIX}{name}"
+            header(metric, "histogram")
+            cumulative = 0
+            for bound, count in zip(h.buckets, h.counts):
+                cumulative += count
+                lines.append(f"{metric}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_bucket{_label_text(labels, [('le', '+Inf')])} {h.count}")
+            lines.append(f"{metric}_sum{_label_text(labels)} {h.sum:.6f}")
+            lines.append(f"{metric}_count{_label_text(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def _write(self, path, text):
+        # Replace the file atomically so a scraper of the file never reads half of it
+        temp = f"{path}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(temp, path)
+
+    def write_json(self, path):
+        self._write(path, json.dumps(self.snapshot(), indent=2, default=str))
+
+    def write_prometheus(self, path):
+        self._write(path, self.prometheus())
+
+    async def export_every(self, path, interval):
+        """Rewrite the Prometheus file every `interval` seconds until cancelled"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.write_prometheus, path)
+            except Exception as e:
+                print(f"Could not write metrics to {path}: {e}")
+
+    async def serve(self, port, host="127.0.0.1"):
+        """Serve the Prometheus text on http://host:port/metrics; returns the asyncio server"""
+        async def handle(reader, writer):
+            try:
+                request = await reader.readline()
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                path = request.split(b" ")[1] if request.count(b" ") >= 2 else b""
+                if path.split(b"?")[0] == b"/metrics":
+                    status, body = "200 OK", self.prometheus().encode()
+                else:
+                    status, body = "404 Not Found", b"not found\n"
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+            finally:
+                writer.close()
+
+        return await asyncio.start_server(handle, host, port)
+
+    def summary(self, top=8):
+        """One line per stage, slowest total first - where the run's time went"""
+        stages = [
+            (dict(labels)["stage"], h) for (name, labels), h in self.histograms.items() if name == "stage_seconds"
+        ]
+        stages.sort(key=lambda item: item[1].sum, reverse=True)
+        lines = ["Time by stage:"]
+        for stage, h in stages[:top]:
+            lines.append(f"  {stage}: {h.sum:.1f}s over {h.count} calls (avg {h.sum / h.count * 1000:.0f} ms, max {h.max * 1000:.0f} ms)")
+        counters = ", ".join(
+            f"{name}{_label_text(labels)} {value}" for (name, labels), value in sorted(self.counters.items())
+        )
+        if counters:
+            lines.append(f"  Counters: {counters}")
+        return "\n".join(lines)
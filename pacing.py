@@ -0,0 +1,61 @@
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+
+
+class Pacer:
+    """Adaptive delay between actions: speeds up while the feed responds, backs off on throttling"""
+
+    def __init__(self, floor, ceiling, start, speedup=0.85, backoff=2.0, slow_response=3.0):
+        self.floor = floor
+        self.ceiling = ceiling
+        self.delay = min(max(start, floor), ceiling)
+        self.speedup = speedup
+        self.backoff = backoff
+        self.slow_response = slow_response
+        self.started = time.time()
+        self.paused = 0.0
+        self.waited = 0.0
+        self.successes = 0
+        self.throttle_events = {}
+
+    def success(self, elapsed=None):
+        """Record a healthy response; slow ones count as throttling instead"""
+        if elapsed is not None and elapsed > self.slow_response:
+            self.throttled("slow response")
+            return
+        self.successes += 1
+        self.delay = max(self.floor, self.delay * self.speedup)
+
+    def throttled(self, reason):
+        """Record a sign of throttling and lengthen the delay"""
+        self.throttle_events[reason] = self.throttle_events.get(reason, 0) + 1
+        self.delay = min(self.ceiling, self.delay * self.backoff)
+        print(f"🐢 Backing off ({reason}): pacing delay now {self.delay:.1f}s")
+
+    async def pause(self):
+        """Sleep for the current delay with a little jitter"""
+        seconds = self.delay * random.uniform(0.75, 1.25)
+        await asyncio.sleep(seconds)
+        self.paused += seconds
+
+    @asynccontextmanager
+    async def waiting(self):
+        """Time a condition wait (e.g. for new cards) as waiting rather than working"""
+        started = time.time()
+        try:
+            yield
+        finally:
+            self.waited += time.time() - started
+
+    def summary(self):
+        """Return a one-line report of how the session's time was spent"""
+        elapsed = time.time() - self.started
+        working = max(0.0, elapsed - self.paused - self.waited)
+        line = (f"Pacing: {elapsed:.0f}s total, {self.paused:.0f}s paced sleeps, "
+                f"{self.waited:.0f}s waiting on the page, {working:.0f}s working; "
+                f"final delay {self.delay:.1f}s")
+        if self.throttle_events:
+            line += " [" + ", ".join(f"{reason}: {count}" for reason, count in sorted(self.throttle_events.items())) + "]"
+        return line
@@ -0,0 +1,78 @@
+import os
+import time
+from urllib.parse import quote
+
+from records import FIELDS
+
+# Typed columns of the Parquet files; "query" is a partition key, not a column
+TYPES = {
+    "rating": "float64",
+    "reviews": "int64",
+    "latitude": "float64",
+    "longitude": "float64",
+    "scraped_at": "timestamp",
+}
+COLUMNS = [field for field in FIELDS if field != "query"]
+
+
+def schema():
+    # pyarrow is only needed for this export, so it is not imported at startup
+    import pyarrow as pa
+    types = {"float64": pa.float64(), "int64": pa.int64(), "timestamp": pa.timestamp("s")}
+    return pa.schema([(field, types[TYPES[field]] if field in TYPES else pa.string()) for field in COLUMNS])
+
+
+def partition_dir(root, query, run_date):
+    """Hive-style partition directory, readable with pyarrow.dataset(..., partitioning="hive")"""
+    return os.path.join(root, f"query={quote(query or '', safe='')}", f"run_date={run_date}")
+
+
+def export_parquet(records, root, run_date=None, batch_size=50000):
+    """Append records as new files in their query/run_date partitions; return the files written
+
+    Existing files are never rewritten: each call adds one part file per partition it touches.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    run_date = run_date or time.strftime("%Y-%m-%d")
+    table_schema = schema()
+    stamp = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    writers = {}
+    buffers = {}
+    written = []
+
+    def flush(query):
+        columns = {field: [] for field in COLUMNS}
+        for record in buffers.pop(query):
+            for field in COLUMNS:
+                value = getattr(record, field)
+                if field == "scraped_at" and value is not None:
+                    value = int(value)
+                columns[field].append(value)
+        if query not in writers:
+            directory = partition_dir(root, query, run_date)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"part-{stamp}.parquet")
+            writers[query] = (pq.ParquetWriter(path + ".tmp", table_schema, compression="zstd"), path)
+        writers[query][0].write_table(pa.table(columns, schema=table_schema))
+
+    completed = False
+    try:
+        for record in records:
+            buffers.setdefault(record.query, []).append(record)
+            if len(buffers[record.query]) >= batch_size:
+                flush(record.query)
+        for query in list(buffers):
+            flush(query)
+        completed = True
+    finally:
+        for writer, path in writers.values():
+            writer.close()
+            # Readers only ever see complete files
+            if completed:
+                os.replace(path + ".tmp", path)
+                written.append(path)
+            else:
+                os.remove(path + ".tmp")
+    return written
@@ -0,0 +1,147 @@
+import re
+import time
+from functools import lru_cache
+
+# Output columns, in export order - the only place the long names are spelled out
+COLUMNS = [
+    "Business name",
+    "Business category",
+    "Full address",
+    "Phone number (if available)",
+    "Website URL",
+    "Star rating",
+    "Total number of reviews",
+    "Business location",
+    "Opening hours",
+    "Latitude",
+    "Longitude",
+    "Place URL",
+    "Search query",
+    "Scraped at",
+]
+
+# Record attribute (and store column) behind each output column
+FIELDS = [
+    "name", "category", "address", "phone", "url", "rating", "reviews", "location",
+    "hours", "latitude", "longitude", "place_url", "query", "scraped_at",
+]
+
+COLUMN_FIELDS = dict(zip(COLUMNS, FIELDS))
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+REVIEW_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_rating(text):
+    """'4.5' or '4,5' -> 4.5; None when there is no rating"""
+    if text is None or isinstance(text, float):
+        return text
+    match = re.search(r"\d+(?:[.,]\d+)?", str(text))
+    return float(match.group().replace(",", ".")) if match else None
+
+
+def parse_reviews(text):
+    """'(1,234)' -> 1234, '1.2K' or '1,2K' -> 1200, '2M' -> 2000000; None when there is no count"""
+    if text is None or isinstance(text, int):
+        return text
+    match = re.search(r"(\d[\d,.]*)\s*([kKmM])?", str(text))
+    if not match:
+        return None
+    number, suffix = match.group(1), match.group(2)
+    if suffix:
+        # Locales with a decimal comma abbreviate as "1,2K"; "1,234K" still groups thousands
+        if "." not in number and "," in number and len(number.rsplit(",", 1)[1]) != 3:
+            number = number.replace(",", ".")
+        return round(float(number.replace(",", "")) * REVIEW_SUFFIXES[suffix.lower()])
+    return int(re.sub(r"[,.]", "", number))
+
+
+def parse_time(text):
+    """Epoch seconds from an exported 'Scraped at' value"""
+    if text is None or isinstance(text, (int, float)):
+        return text
+    try:
+        return time.mktime(time.strptime(text, TIME_FORMAT))
+    except ValueError:
+        return None
+
+
+def _float(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+PARSERS = {
+    "rating": parse_rating,
+    "reviews": parse_reviews,
+    "latitude": _float,
+    "longitude": _float,
+    "scraped_at": parse_time,
+}
+
+
+def coerce(field, value):
+    """Typed value of a field; missing values ("N/A", "") become None"""
+    if value in ("N/A", ""):
+        value = None
+    parse = PARSERS.get(field)
+    return parse(value) if parse and value is not None else value
+
+
+@lru_cache(maxsize=256)
+def _format_time(seconds):
+    return time.strftime(TIME_FORMAT, time.localtime(seconds))
+
+
+def export_value(field, value):
+    """Text written to the output files for a typed value"""
+    if value is None:
+        return "N/A"
+    if field == "scraped_at":
+        return _format_time(int(value))
+    return value
+
+
+class Record:
+    """One business, with typed fields and no per-record key strings
+
+    Column-name access (record["Business name"], record.get(...)) is kept for
+    code that treats records as output rows; the names live only in COLUMNS.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            setattr(self, field, coerce(field, fields.get(field)))
+
+    @classmethod
+    def from_row(cls, row):
+        """Build a record from an exported row (CSV/JSONL dict keyed by column name)"""
+        return cls(**{field: row.get(column) for column, field in COLUMN_FIELDS.items()})
+
+    def __getitem__(self, column):
+        return getattr(self, COLUMN_FIELDS[column])
+
+    def __setitem__(self, column, value):
+        field = COLUMN_FIELDS[column]
+        setattr(self, field, coerce(field, value))
+
+    def get(self, column, default=None):
+        field = COLUMN_FIELDS.get(column)
+        value = getattr(self, field) if field else None
+        return default if value is None else value
+
+    def to_row(self):
+        """The record as an output row keyed by column name"""
+        return {column: export_value(field, getattr(self, field)) for column, field in COLUMN_FIELDS.items()}
+
+
+def as_row(record):
+    """Output row for a Record or an already-exported row dict"""
+    return record.to_row() if isinstance(record, Record) else record
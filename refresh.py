@@ -0,0 +1,104 @@
+import json
+import time
+from urllib.parse import quote_plus
+
+from dedup import normalize_phone
+from records import coerce, export_value
+
+# Record field re-read on a refresh -> key of its value in the detail-page result (enrichment.DETAIL_JS)
+REFRESH_FIELDS = {
+    "rating": "rating",
+    "reviews": "reviews",
+    "phone": "phone",
+    "url": "website",
+    "hours": "hours",
+}
+
+NUMERIC_FIELDS = ("rating", "reviews")
+
+SEARCH_URL = "https://www.google.com/maps/search/?api=1&query="
+
+
+def search_url(record):
+    """Maps search for a record without a place page; a specific name + address opens the place itself"""
+    terms = [value for value in (record.name, record.address or record.location) if value]
+    return SEARCH_URL + quote_plus(", ".join(terms))
+
+
+def is_search_url(url):
+    return bool(url) and url.startswith(SEARCH_URL)
+
+
+def refresh_record(record, details):
+    """Overwrite the record's fields with a detail page's values and stamp it; return {field: change}
+
+    A field the page does not show keeps its old value: a missing website is far
+    more often a slow render than a removed one. A closed business gets its
+    status as opening hours, the way Maps shows it.
+    """
+    changes = {}
+    if is_search_url(record.place_url):
+        # Found by name: only a single place page is trusted, and its URL is kept from now on
+        url = details.get("url") or ""
+        if "/maps/place/" not in url:
+            raise ValueError("the name + address search did not open a single place")
+        changes["place_url"] = {"old": None, "new": url}
+        record.place_url = url
+    fresh = {field: details.get(key) for field, key in REFRESH_FIELDS.items()}
+    if details.get("status"):
+        fresh["hours"] = details["status"]
+    for field, value in fresh.items():
+        new = coerce(field, value)
+        if new is None:
+            continue
+        old = getattr(record, field)
+        if new == old or (field == "phone" and old and normalize_phone(new) and normalize_phone(new) == normalize_phone(old)):
+            continue  # the detail page gives tel: digits; a reformatted number is not a change
+        change = {"old": old, "new": new}
+        if field in NUMERIC_FIELDS and old is not None:
+            change["delta"] = round(new - old, 2)
+        changes[field] = change
+        setattr(record, field, new)
+    if details.get("status") and "hours" in changes:
+        changes["status"] = details["status"]  # newly closed (already-closed places stay unchanged)
+    record.scraped_at = time.time()
+    return changes
+
+
+class RefreshLog:
+    """Field-level diffs of refreshed records, appended to a JSONL file, with run totals"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.refreshed = 0
+        self.changed = 0
+        self.closed = 0
+        self.failed = 0
+        self.fields = {}
+
+    def write(self, record_id, record, changes, previous_scraped_at):
+        """Count a refreshed record and log its changes (unchanged records are only counted)"""
+        self.refreshed += 1
+        if not changes:
+            return
+        self.changed += 1
+        if "status" in changes:
+            self.closed += 1
+        for field in changes:
+            self.fields[field] = self.fields.get(field, 0) + 1
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "id": record_id,
+                    "name": record.name,
+                    "place_url": record.place_url,
+                    "previous_scraped_at": export_value("scraped_at", previous_scraped_at),
+                    "scraped_at": export_value("scraped_at", record.scraped_at),
+                    "changes": changes,
+                }, ensure_ascii=False) + "\n")
+
+    def summary(self):
+        parts = [f"{self.refreshed} refreshed", f"{self.changed} changed", f"{self.closed} closed", f"{self.failed} failed"]
+        if self.fields:
+            parts.append("changes: " + ", ".join(f"{count} {field}" for field, count in sorted(self.fields.items())))
+        return "Refresh: " + ", ".join(parts)
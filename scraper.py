@@ -1,316 +1,743 @@
 import time
-import pandas as pd
+
+# Measured from the first line so startup regressions show up in the run output
+_import_started = time.perf_counter()
+
 import config
 import asyncio
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import random
-from datetime import datetime
 import os
+from array import array
+from collections import namedtuple
+import maps_payload
+import sessions
+import tiling
+from blocking import RequestBlocker
+from writer import RecordWriter
+from store import RecordStore
+from pacing import Pacer
+from enrichment import EnrichmentPool, coordinates_from_url, merge_details
+from cache import PlaceCache, place_key
+from locations import Gazetteer
+from metrics import COUNT_BUCKETS, Metrics
+from jobqueue import JobQueue, default_worker_id
+from selector_registry import SelectorRegistry
+from records import Record, export_value
+from parquet_export import export_parquet
+from refresh import RefreshLog, refresh_record, search_url
+
+# Store ids of the new records scraped in this session (the records themselves live in the store)
+session_ids = array("q")
+
+# New records added per job (query or query tile) in this session
+query_counts = {}
+
+# Cards the feed of each job reached; decides whether a tile gets subdivided
+job_card_counts = {}
+
+# Appends new records to disk in the background; the store learns which ids made it (see mark_written)
+writer = RecordWriter(config.CSV_OUTPUT, config.JSONL_OUTPUT, config.FLUSH_INTERVAL,
+                      on_written=lambda ids: mark_written(ids))
+
+# Dedup index and record store shared by every query, retry and run (see open_store)
+store = None
+
+# Identifies this process in the shared job queue and as the owner of its unwritten records
+worker_id = config.WORKER_ID or default_worker_id()
+
+# Place-detail cache shared by extraction and enrichment (see open_cache)
+place_cache = None
+
+# Locality matcher behind resolve_location (see open_gazetteer)
+gazetteer = None
+
+# Place-detail enrichment pool, started by run() when config.ENRICH is on
+enrichment = None
+
+# Browser sessions (profile + optional proxy each) that attempts are leased from (see open_sessions)
+session_pool = None
+
+# Shared by every worker page: throttling is per browser/IP, not per query
+pacer = Pacer(
+    floor=config.PACE_FLOOR,
+    ceiling=config.PACE_CEILING,
+    start=config.PACE_START,
+    speedup=config.PACE_SPEEDUP,
+    backoff=config.PACE_BACKOFF,
+    slow_response=config.SLOW_RESPONSE,
+)
+
+# Seconds from navigation to a loaded results feed, one entry per search
+page_load_times = []
+
+# Seconds spent importing this module and loading existing data
+startup_times = {}
+
+# Stage timers, counters and histograms for the whole run (exported by run())
+metrics = Metrics()
+
+# Candidate selectors per field, with the winners remembered across runs (see open_selector_registry)
+selector_registry = None
+
+
+def collect_gauges(m):
+    """Refresh the gauges read from other components before each metrics export"""
+    for step, seconds in startup_times.items():
+        m.gauge("startup_seconds", round(seconds, 6), step=step)
+    m.gauge("pacer_delay_seconds", round(pacer.delay, 3))
+    m.gauge("pacer_paused_seconds", round(pacer.paused, 3))
+    m.gauge("pacer_waited_seconds", round(pacer.waited, 3))
+    m.gauge("records_session", len(session_ids))
+    m.gauge("rows_written", writer.written)
+    if enrichment:
+        m.gauge("enrichment_pending", len(enrichment.pending))
+    for field, selector, hits, avg_ms in (selector_registry.stats() if selector_registry else []):
+        if selector:
+            m.gauge("selector_hits", hits, field=field, selector=selector)
+            m.gauge("selector_lookup_ms", round(avg_ms, 3), field=field, selector=selector)
+        else:
+            m.gauge("selector_misses", hits, field=field)
+    if session_pool:
+        for name, score, leases, blocks, latency, cooling in session_pool.stats():
+            m.gauge("session_score", round(score, 4), session=name)
+            m.gauge("session_leases", leases, session=name)
+            m.gauge("session_blocks", blocks, session=name)
+            m.gauge("session_cooling", int(cooling), session=name)
+            if latency is not None:
+                m.gauge("session_load_seconds", round(latency, 3), session=name)
+    if place_cache:
+        m.gauge("place_cache_hits", place_cache.hits)
+        m.gauge("place_cache_misses", place_cache.misses)
+
+
+metrics.add_collector(collect_gauges)
+
+
+def open_store():
+    """Open the record store on first use"""
+    global store
+    if store is None:
+        store = RecordStore(config.STORE_PATH, config.DEDUP_LOG, worker_id)
+    return store
+
+
+def open_cache():
+    """Open the place-detail cache on first use; None when CACHE_PATH is not set"""
+    global place_cache
+    if place_cache is None and config.CACHE_PATH:
+        place_cache = PlaceCache(config.CACHE_PATH, config.CACHE_TTL_DAYS * 86400, config.CACHE_MAX_ENTRIES)
+    return place_cache
+
+
+def open_selector_registry():
+    """Load the selector registry and its remembered winners on first use"""
+    global selector_registry
+    if selector_registry is None:
+        selector_registry = SelectorRegistry(config.SELECTOR_CACHE, min_samples=config.FILL_RATE_MIN_SAMPLES,
+                                             drop_ratio=config.FILL_RATE_DROP)
+    return selector_registry
+
+
+def load_existing_data():
+    """Import output CSV rows the store has not seen yet; return how many were new"""
+    start = time.perf_counter()
+    imported = open_store().import_csv(config.CSV_OUTPUT)
+    startup_times["load_existing_data"] = time.perf_counter() - start
+    
+    if imported:
+        print(f"Imported {imported} existing records from {config.CSV_OUTPUT} into {config.STORE_PATH}")
+    elif os.path.exists(config.CSV_OUTPUT):
+        print(f"{config.STORE_PATH} is up to date with {config.CSV_OUTPUT}")
+    else:
+        print(f"No existing data found at {config.CSV_OUTPUT}. Starting fresh.")
+    return imported
+
+
+def mark_written(ids):
+    """Flag stored records as safely in the output files"""
+    open_store().mark_written(ids)
+
+
+def recover_unwritten(include_own=False):
+    """Queue records that a dead worker stored but never wrote out (it was killed before a flush)
+
+    include_own also takes this worker id's leftovers - only safe before anything was queued.
+    """
+    records = open_store().unwritten_records(config.QUEUE_LEASE_SECONDS, include_own)
+    for record_id, record in records:
+        writer.write(record, record_id)
+    if records:
+        print(f"♻️  Recovered {len(records)} stored records that never reached {config.CSV_OUTPUT}")
+    return len(records)
+
+
+async def keep_writer_alive():
+    """Renew this worker's heartbeat in the store and write out records of workers that died meanwhile"""
+    while True:
+        await asyncio.sleep(config.QUEUE_HEARTBEAT)
+        try:
+            open_store().heartbeat()
+            recover_unwritten()
+        except Exception as e:
+            print(f"Store heartbeat failed: {e}")
+
+
+def report_startup():
+    """Print how long startup took so regressions are visible"""
+    parts = [f"{name} {seconds * 1000:.0f} ms" for name, seconds in startup_times.items()]
+    print(f"⏱️  Startup: {', '.join(parts)}")
+
 
-# Initialize data and seen_urls
-data = []
-seen_urls = set()
-
-# Check if the CSV file exists
-if os.path.exists(config.CSV_OUTPUT):
-     df_existing = pd.read_csv(config.CSV_OUTPUT)
-     # Convert to list of dictionaries
-     existing_records = df_existing.to_dict('records')
-     for record in existing_records:
-         # We use the same logic as in add_item to create the identifiers
-         url = record.get("Website URL", "N/A")
-         if url != "N/A":
-             seen_urls.add(url)
-         else:
-             # Use name and address as identifier
-             unique_id = f"{record.get('Business name', '')}|{record.get('Full address', '')}"
-             seen_urls.add(unique_id)
-         data.append(record)
-     print(f"Loaded {len(data)} existing records from {config.CSV_OUTPUT}")
-else:
-     print(f"No existing data found at {config.CSV_OUTPUT}. Starting fresh.")
-
-     
 # ------------------------
 # Helpers
 # ------------------------
-def add_item(name, category, address, phone, url, rating, reviews, location):
-    """Add item to data list if URL is not already seen"""
-    # Skip if URL is already in our set (or if it's "N/A" and we've seen this name)
-    if url != "N/A" and url in seen_urls:
-        print(f"⚠️  Duplicate URL skipped: {name} ({url})")
+def add_item(name, category, address, phone, url, rating, reviews, location, query=None,
+             hours="N/A", latitude="N/A", longitude="N/A", place_url="N/A"):
+    """Add item to the store and output files if it is not already stored"""
+    record = Record(
+        name=name,
+        category=category,
+        address=address,
+        phone=phone,
+        url=url,
+        rating=rating,
+        reviews=reviews,
+        location=location,
+        hours=hours,
+        latitude=latitude,
+        longitude=longitude,
+        place_url=place_url,
+        query=query or config.SEARCH,
+        scraped_at=time.time(),
+    )
+    
+    # Details fetched for this place recently - no need to open its page again
+    cached = None
+    if place_url != "N/A" and open_cache():
+        cached = place_cache.get(place_key(place_url))
+        if cached:
+            merge_details(record, cached)
+    
+    # The store's dedup index catches exact and near duplicates (place id, phone, name + address/location)
+    record_id = open_store().add(record)
+    if not record_id:
+        _, reason, _ = store.dedup.last_decision
+        metrics.inc("duplicates", reason=reason)
+        print(f"⚠️  Duplicate business skipped: {name} ({reason})")
         return False
+    metrics.inc("records_added")
     
-    # Also check for duplicate names for businesses without URLs
-    if url == "N/A":
-        # Create a unique identifier from name + address for duplicate checking
-        unique_id = f"{name}|{address}"
-        if unique_id in seen_urls:  # Reusing the set for all unique identifiers
-            print(f"⚠️  Duplicate business skipped: {name} ({address})")
-            return False
-        seen_urls.add(unique_id)
+    session_ids.append(record_id)
+    if enrichment and place_url != "N/A" and not cached:
+        # Written once the detail page has filled in phone, website, hours and coordinates
+        enrichment.submit(record_id, record)
     else:
-        seen_urls.add(url)
-    
-    data.append({
-        "Business name": name,
-        "Business category": category,
-        "Full address": address,
-        "Phone number (if available)": phone,
-        "Website URL": url,
-        "Star rating": rating,
-        "Total number of reviews": reviews,
-        "Business location": location,
-        "Scraped at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
+        writer.write(record, record_id)
     return True
 
 
-async def safe_text(locator, timeout=5000):
-    """Safely extract text from locator with timeout and retry"""
+def finish_enriched(record_id, record, filled=None):
+    """Store and write a record coming back from the enrichment pool (enriched or not)"""
+    open_store().update(record_id, record)
+    writer.write(record, record_id)
+
+
+def is_timeout(error):
+    """True for Playwright's TimeoutError (imported lazily elsewhere) or asyncio's"""
+    return isinstance(error, asyncio.TimeoutError) or type(error).__name__ == "TimeoutError"
+
+
+# JavaScript installed once per page: a MutationObserver keys every inserted
+# business card on its place link and queues only cards it has not seen yet.
+# drain() reads all fields of the queued cards in a single round-trip, trying
+# each field's candidate selectors from the registry (winner first) and
+# returning which selector filled each field.
+CARD_TRACKER_JS = """
+([knownKeys, selectors]) => {
+    if (window.__gmsCards) return window.__gmsCards.total();
+    const SELECTOR = "div[role='article']";
+    const visible = (el) => !!el && el.getClientRects().length > 0;
+    const text = (el) => (visible(el) && el.innerText ? el.innerText.trim() : null);
+    const known = new Set(knownKeys || []);
+    const attempts = new WeakMap();
+    const queue = [];
+    let discovered = 0;
+    let stats = {};
+
+    // First candidate that matches; a winner further down moves to the front for later cards
+    const pick = (root, field, all, used) => {
+        const candidates = selectors[field] || [];
+        for (let i = 0; i < candidates.length; i++) {
+            const found = all ? root.querySelectorAll(candidates[i]) : root.querySelector(candidates[i]);
+            if (all ? found.length : found) {
+                if (used) used[field] = candidates[i];
+                if (i > 0) candidates.unshift(candidates.splice(i, 1)[0]);
+                return found;
+            }
+        }
+        if (used) used[field] = "";
+        return all ? [] : null;
+    };
+
+    const keyOf = (card) => {
+        const place = pick(card, "place_link");
+        if (place) {
+            const href = place.getAttribute("href");
+            const id = href.match(/!1s(0x[0-9a-f]+:0x[0-9a-f]+)/i);
+            return id ? id[1] : href.split("?")[0];
+        }
+        return card.getAttribute("aria-label") || null;
+    };
+    const offer = (card) => {
+        if (card.dataset.gmsKey) return;
+        const key = keyOf(card);
+        if (!key) return;  // not rendered yet - picked up by a later mutation
+        card.dataset.gmsKey = key;
+        discovered += 1;
+        if (known.has(key)) return;
+        known.add(key);
+        card.dataset.gmsPending = "1";  // not extracted yet - never pruned
+        queue.push(card);
+    };
+    const scan = (node) => {
+        if (node.nodeType !== Node.ELEMENT_NODE) return;
+        const card = node.closest(SELECTOR);
+        if (card) return offer(card);
+        node.querySelectorAll(SELECTOR).forEach(offer);
+    };
+    const extract = (card, used) => {
+        const container = pick(card, "container", false, used) || card;
+        const link = pick(card, "website", false, used);
+        const place = pick(card, "place_link", false, used);
+        const phone = pick(card, "phone", false, used);
+        return {
+            key: card.dataset.gmsKey,
+            name: text(pick(container, "name", false, used)),
+            infoBlocks: Array.from(pick(container, "info", true, used)).map(text),
+            url: link ? link.getAttribute("href") : null,
+            placeUrl: place ? place.getAttribute("href") : null,
+            rating: text(pick(container, "rating", false, used)),
+            reviews: text(pick(container, "reviews", false, used)),
+            phone: text(phone),
+        };
+    };
+
+    document.querySelectorAll(SELECTOR).forEach(offer);
+    new MutationObserver((mutations) => {
+        for (const mutation of mutations) mutation.addedNodes.forEach(scan);
+    }).observe(document.body, {childList: true, subtree: true});
+
+    window.__gmsCards = {
+        total: () => discovered,
+        drain: (maxAttempts) => {
+            const cards = [];
+            for (const card of queue.splice(0, queue.length)) {
+                const used = {};
+                const record = extract(card, used);
+                const tries = (attempts.get(card) || 0) + 1;
+                // Cards still rendering have no name yet - retry them on the next drain
+                if (!record.name && tries < maxAttempts) {
+                    attempts.set(card, tries);
+                    queue.push(card);
+                    continue;
+                }
+                delete card.dataset.gmsPending;
+                cards.push(record);
+                for (const [field, selector] of Object.entries(used)) {
+                    const counts = stats[field] || (stats[field] = {});
+                    counts[selector] = (counts[selector] || 0) + 1;
+                }
+            }
+            const drained = stats;
+            stats = {};
+            return {total: discovered, cards: cards, stats: drained};
+        },
+    };
+    return discovered;
+}
+"""
+
+DRAIN_CARDS_JS = """
+(maxAttempts) => window.__gmsCards ? window.__gmsCards.drain(maxAttempts) : null
+"""
+
+
+# Collapse cards that were already read into empty placeholders of the same
+# height, so the feed's DOM stops growing while scrolling and card counts stay
+# right. The last `keep` cards and cards not yet extracted are left intact.
+PRUNE_CARDS_JS = """
+([keep, requireKey]) => {
+    const cards = Array.from(document.querySelectorAll("div[role='article']"));
+    let collapsed = 0;
+    for (const card of cards.slice(0, Math.max(0, cards.length - keep))) {
+        if (card.dataset.gmsCollapsed || card.dataset.gmsPending) continue;
+        if (requireKey && !card.dataset.gmsKey) continue;
+        card.style.height = card.offsetHeight + "px";
+        card.replaceChildren();
+        card.dataset.gmsCollapsed = "1";
+        collapsed += 1;
+    }
+    return collapsed;
+}
+"""
+
+MEMORY_JS = """
+() => ({
+    heap: performance.memory ? performance.memory.usedJSHeapSize : null,
+    nodes: document.getElementsByTagName("*").length,
+})
+"""
+
+
+class RecyclePage(Exception):
+    """The page crossed a memory threshold; the query continues on a fresh page"""
+
+
+async def prune_cards(page):
+    """Collapse extracted cards; return how many were collapsed"""
     try:
-        await locator.wait_for(state="visible", timeout=timeout)
-        text = await locator.inner_text()
-        return text.strip() if text else "N/A"
-    except:
-        return "N/A"
+        collapsed = await page.evaluate(PRUNE_CARDS_JS, [config.PRUNE_KEEP_CARDS, config.EXTRACTION_MODE == "dom"])
+    except Exception as e:
+        print(f"Could not prune cards: {e}")
+        return 0
+    metrics.inc("cards_collapsed", collapsed)
+    return collapsed
 
 
-async def safe_attribute(locator, attribute, timeout=5000):
-    """Safely get attribute from locator with timeout"""
+async def check_memory(page):
+    """Raise RecyclePage when the renderer's JS heap or DOM node count is past its limit"""
     try:
-        await locator.wait_for(state="attached", timeout=timeout)
-        return await locator.get_attribute(attribute) or "N/A"
-    except:
-        return "N/A"
+        usage = await page.evaluate(MEMORY_JS)
+    except Exception:
+        return
+    heap_mb = usage["heap"] / 1e6 if usage["heap"] else None
+    metrics.gauge("dom_nodes", usage["nodes"])
+    if heap_mb is not None:
+        metrics.gauge("js_heap_mb", round(heap_mb, 1))
+    if heap_mb is not None and heap_mb > config.MAX_JS_HEAP_MB:
+        raise RecyclePage(f"JS heap {heap_mb:.0f} MB > {config.MAX_JS_HEAP_MB} MB")
+    if usage["nodes"] > config.MAX_DOM_NODES:
+        raise RecyclePage(f"{usage['nodes']} DOM nodes > {config.MAX_DOM_NODES}")
 
 
-async def extract_and_add_business_data(card, attempt=1):
-    """Extract data from a business card with retry logic"""
-    max_attempts = 3
+class CardTracker:
+    """Track business cards by stable identity and hand out only the new ones"""
     
-    try:
-        # Wait for card to be stable
-        await card.wait_for(state="visible", timeout=5000)
-        
-        # Get the container where most data is stored
-        container = card.locator(".UaQhfb.fontBodyMedium")
-        await container.wait_for(state="attached", timeout=3000)
+    def __init__(self, max_attempts=3):
+        self.max_attempts = max_attempts
+        self.seen_keys = set()
+        self.card_count = 0
+    
+    def attach(self, page):
+        """Nothing to hook up front - the observer is installed on the first drain"""
+    
+    def parse(self, raw):
+        """Turn a raw card record into business fields"""
+        return parse_card(raw)
+    
+    async def install(self, page):
+        """Install the in-page observer (no-op if it is already running)"""
+        self.card_count = await page.evaluate(
+            CARD_TRACKER_JS, [list(self.seen_keys), open_selector_registry().page_candidates()]
+        )
+    
+    async def drain(self, page):
+        """Return raw records for cards inserted since the last drain"""
+        try:
+            result = await page.evaluate(DRAIN_CARDS_JS, self.max_attempts)
+            if result is None:
+                # New document (first run, reload or retry) - observer must be reinstalled
+                await self.install(page)
+                result = await page.evaluate(DRAIN_CARDS_JS, self.max_attempts)
+        except Exception as e:
+            print(f"Error draining new cards: {e}")
+            return []
         
-        # 1. Business Name
-        name_element = container.locator(".qBF1Pd.fontHeadlineSmall")
-        name = await safe_text(name_element)
+        self.card_count = result["total"]
+        for field in open_selector_registry().merge(result.get("stats") or {}):
+            metrics.inc("selector_alerts", field=field)
+        cards = [raw for raw in result["cards"] if raw["key"] not in self.seen_keys]
+        self.seen_keys.update(raw["key"] for raw in cards)
+        return cards
+
+
+class NetworkCollector:
+    """Collect business records from the Maps search responses instead of the DOM"""
+    
+    def __init__(self):
+        self.seen_keys = set()
+        self.pending = []
+        self.card_count = 0
+        self.responses = 0
+    
+    def attach(self, page):
+        """Listen to the page's search responses"""
+        page.on("response", self._on_response)
+    
+    async def _on_response(self, response):
+        if not maps_payload.is_search_response(response.url):
+            return
+        try:
+            text = await response.text()
+        except Exception as e:
+            print(f"Could not read search response: {e}")
+            return
         
-        if name == "N/A" and attempt < max_attempts:
-            await asyncio.sleep(random.uniform(0.5, 1.5))
-            return await extract_and_add_business_data(card, attempt + 1)
-        elif name == "N/A":
-            print("Skipping card - no name found after retries")
-            return False
+        self.responses += 1
+        if config.CAPTURE_RESPONSES_DIR:
+            # Keep the raw body so the parser can be checked offline later
+            os.makedirs(config.CAPTURE_RESPONSES_DIR, exist_ok=True)
+            path = os.path.join(config.CAPTURE_RESPONSES_DIR, f"search_{int(time.time() * 1000)}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
         
-        # ---- CATEGORY & ADDRESS ----
-        category = "N/A"
-        address = "N/A"
+        self.pending.extend(maps_payload.parse_search_payload(text))
+    
+    async def install(self, page):
+        """Nothing to install - records arrive through the response listener"""
+    
+    async def drain(self, page):
+        """Return records received since the last drain"""
+        records = []
+        for record in self.pending:
+            if record["key"] not in self.seen_keys:
+                self.seen_keys.add(record["key"])
+                records.append(record)
+        self.pending = []
+        self.card_count = len(self.seen_keys)
+        return records
+    
+    def parse(self, record):
+        """Reduce a decoded listing to the business fields"""
+        fields = {name: record[name] for name in ("name", "category", "address", "phone", "url", "rating", "reviews")}
+        fields["location"] = resolve_location(fields["address"])
+        fields["latitude"] = record["latitude"] if record["latitude"] is not None else "N/A"
+        fields["longitude"] = record["longitude"] if record["longitude"] is not None else "N/A"
+        fields["place_url"] = (
+            f"https://www.google.com/maps/place/?q=place_id:{record['place_id']}" if record["place_id"] else "N/A"
+        )
+        return fields
+
+
+def new_tracker():
+    """Create the card source for the configured extraction mode"""
+    if config.EXTRACTION_MODE == "network":
+        return NetworkCollector()
+    return CardTracker()
+
+
+def open_gazetteer():
+    """Load the locality gazetteer on first use"""
+    global gazetteer
+    if gazetteer is None:
+        gazetteer = Gazetteer.load(config.GAZETTEER_PATH)
+    return gazetteer
+
+
+def resolve_location(address):
+    """Map an address to the business location used in the output"""
+    if not address or address == "N/A":
+        return config.DEFAULT_LOCATION
+    return open_gazetteer().resolve(address, config.DEFAULT_LOCATION)
+
+
+def parse_card(raw):
+    """Apply the text heuristics to a raw card record and return the business fields"""
+    # 1. Business Name
+    name = raw.get("name") or "N/A"
+    
+    # ---- CATEGORY & ADDRESS ----
+    category = "N/A"
+    address = "N/A"
+    
+    for text in raw.get("infoBlocks") or []:
+        if not text or text in ("·",):
+            continue
         
-        try:
-            info_blocks = container.locator(".W4Efsd span")
-            block_count = await info_blocks.count()
-            
-            for i in range(block_count):
-                text = await safe_text(info_blocks.nth(i), 2000)
-                
-                if not text or text in ("·",):
-                    continue
-                
-                # CATEGORY: short, no digits, no RM, no Open/Closed
-                if (category == "N/A" and len(text) < 30 and 
-                    not any(x in text for x in ["RM", "Open", "Closed", "Opens", "closes"]) and
-                    not any(char.isdigit() for char in text)):
-                    category = text
-                    continue
-                
-                # ADDRESS: long text with numbers or commas
-                if (address == "N/A" and len(text) > 20 and 
-                    (any(char.isdigit() for char in text) or ',' in text)):
-                    address = text
-        except:
-            pass
+        # CATEGORY: short, no digits, no RM, no Open/Closed
+        if (category == "N/A" and len(text) < 30 and 
+            not any(x in text for x in ["RM", "Open", "Closed", "Opens", "closes"]) and
+            not any(char.isdigit() for char in text)):
+            category = text
+            continue
         
-        # 4. URL
-        link_element = card.locator("a.lcr4fd")
-        url = await safe_attribute(link_element, "href")
-        
-        # 5. Rating
-        rating_element = container.locator(".MW4etd")
-        rating = await safe_text(rating_element, 2000)
-        
-        # 6. Reviews
-        reviews_element = container.locator(".UY7F9")
-        reviews_raw = await safe_text(reviews_element, 2000)
-        reviews = reviews_raw.replace("(", "").replace(")", "").strip()
-        
-        # 7. Phone (try to find in card)
-        phone = "N/A"
-        phone_elements = card.locator('button[data-item-id*="phone"]')
-        if await phone_elements.count() > 0:
-            phone_text = await safe_text(phone_elements.first(), 2000)
-            if phone_text != "N/A":
-                phone = phone_text
-        
-        # 8. Location
-        location = config.DEFAULT_LOCATION
-        if "Kuala Lumpur" in address or "KL" in address:
-            location = "Kuala Lumpur"
-        elif "Petaling Jaya" in address or "PJ" in address:
-            location = "Petaling Jaya"
-        elif "Subang" in address:
-            location = "Subang"
-        elif "Cheras" in address:
-            location = "Cheras"
-        
-        # Add to data list with duplicate check
-        added = add_item(
-            name=name,
-            category=category,
-            address=address,
-            phone=phone,
-            url=url,
-            rating=rating,
-            reviews=reviews,
-            location=location
-        )
+        # ADDRESS: long text with numbers or commas
+        if (address == "N/A" and len(text) > 20 and 
+            (any(char.isdigit() for char in text) or ',' in text)):
+            address = text
+    
+    # 4. URL
+    url = raw.get("url") or "N/A"
+    
+    # 5. Rating
+    rating = raw.get("rating") or "N/A"
+    
+    # 6. Reviews
+    reviews = (raw.get("reviews") or "N/A").replace("(", "").replace(")", "").strip()
+    
+    # 7. Phone (try to find in card)
+    phone = raw.get("phone") or "N/A"
+    
+    # Place link (detail page) and the coordinates encoded in it
+    place_url = raw.get("placeUrl") or "N/A"
+    coordinates = coordinates_from_url(raw.get("placeUrl"))
+    
+    # 8. Location
+    location = resolve_location(address)
+    
+    return {
+        "name": name,
+        "category": category,
+        "address": address,
+        "phone": phone,
+        "url": url,
+        "rating": rating,
+        "reviews": reviews,
+        "location": location,
+        "latitude": coordinates[0] if coordinates else "N/A",
+        "longitude": coordinates[1] if coordinates else "N/A",
+        "place_url": place_url,
+    }
+
+
+def extract_and_add_business_data(raw, query=None, parse=parse_card):
+    """Parse a raw card record and add it to the store unless it is a duplicate; return True if added"""
+    with metrics.timer("card"):
+        fields = parse(raw)
         
-        if added:
-            print(f"✓ Added: {name}")
-        return added
+        if fields["name"] == "N/A":
+            metrics.inc("cards_skipped", reason="no name")
+            print("Skipping card - no name found after retries")
+            return False
         
-    except Exception as e:
-        if attempt < max_attempts:
-            await asyncio.sleep(random.uniform(1, 2))
-            return await extract_and_add_business_data(card, attempt + 1)
-        print(f"✗ Error extracting data (attempt {attempt}): {e}")
-        return False
+        # Store it (the dedup index rejects duplicates) and queue it for writing
+        added = add_item(query=query, **fields)
+    
+    if added:
+        print(f"✓ Added: {fields['name']}")
+    return added
+
+
+async def scrape_current_businesses(page, tracker, job=None):
+    """Scrape the business cards that appeared since the last call"""
+    with metrics.timer("batch"):
+        return await _scrape_current_businesses(page, tracker, job)
 
 
-async def scrape_current_businesses(page):
-    """Scrape all currently loaded business cards"""
+async def _scrape_current_businesses(page, tracker, job):
     try:
         # Wait for at least one business card
         await page.wait_for_selector("div[role='article']", timeout=10000)
         
-        business_cards = page.locator("div[role='article']")
-        current_count = await business_cards.count()
+        # Pull every new card in a single batch
+        with metrics.timer("drain"):
+            raw_cards = await tracker.drain(page)
+        metrics.inc("cards_seen", len(raw_cards))
+        metrics.observe("batch_cards", len(raw_cards), buckets=COUNT_BUCKETS)
         
-        if current_count == 0:
+        if tracker.card_count == 0:
             print("No business cards found")
             return 0
         
-        print(f"Found {current_count} business cards, checking for new ones...")
-        
-        # Get indices of already scraped cards
-        already_scraped = len(data)
+        print(f"Found {tracker.card_count} business cards, {len(raw_cards)} new")
         
         # Only scrape new cards
         new_cards_scraped = 0
-        for i in range(already_scraped, current_count):
+        for raw in raw_cards:
             try:
-                card = business_cards.nth(i)
-                if await extract_and_add_business_data(card):
+                if extract_and_add_business_data(raw, job.query if job else None, tracker.parse):
                     new_cards_scraped += 1
-                
-                # Random delays to appear human-like
-                if i % 3 == 0:
-                    delay = random.uniform(0.5, 2)
-                    await page.wait_for_timeout(int(delay * 1000))
-                
-                # Occasionally move mouse
-                if random.random() > 0.8:
-                    await page.mouse.move(
-                        random.randint(100, 400),
-                        random.randint(100, 400)
-                    )
-                    
+                    if job:
+                        query_counts[job.key] = query_counts.get(job.key, 0) + 1
             except Exception as e:
-                print(f"Error processing card {i}: {e}")
+                metrics.inc("errors", stage="card")
+                print(f"Error processing card {raw.get('key')}: {e}")
                 continue
         
+        # Hold the feed while the enrichment backlog is full
+        if enrichment:
+            async with pacer.waiting():
+                await enrichment.wait_for_room()
+        
+        # Checkpoint the batch so a retry or a new process can skip these cards
+        if job:
+            open_store().save_checkpoint(job.key, [raw["key"] for raw in raw_cards], tracker.card_count, query_counts.get(job.key, 0))
+        
+        # Occasionally move mouse
+        if random.random() > 0.8:
+            await page.mouse.move(
+                random.randint(100, 400),
+                random.randint(100, 400)
+            )
+        
         # Show summary including duplicates
-        total_processed = current_count - already_scraped
+        total_processed = len(raw_cards)
         duplicates = total_processed - new_cards_scraped
         if duplicates > 0:
             print(f"Processed {total_processed} cards: {new_cards_scraped} new, {duplicates} duplicates")
         else:
             print(f"Scraped {new_cards_scraped} new businesses")
         
-        print(f"Unique records so far: {len(data)}")
+        print(f"New unique records this session: {len(session_ids)}")
         
         return new_cards_scraped
         
     except Exception as e:
+        metrics.inc("errors", stage="batch")
+        if is_timeout(e):
+            metrics.inc("timeouts", stage="batch")
         print(f"Error in scrape_current_businesses: {e}")
         return 0
 
 
 async def save_data():
-    """Save data to CSV and Excel"""
-    if not data:
-        print("No data to save")
+    """Flush new records to CSV/JSONL and export the Excel file"""
+    with metrics.timer("save_data"):
+        await writer.close()
+        if writer.written == 0 and not os.path.exists(config.CSV_OUTPUT):
+            print("No data to save")
+            return
+        print(f"✅ Data saved to {config.CSV_OUTPUT} ({writer.written} new rows)")
+        if config.PARQUET_DIR:
+            export_session_parquet()
+        await writer.export_excel(config.EXCEL_OUTPUT)
+
+
+def export_session_parquet():
+    """Append this session's records to the partitioned Parquet dataset"""
+    if not session_ids:
         return
-    
-    df = pd.DataFrame(data)
-    
-    # Save to CSV
     try:
-        df.to_csv(config.CSV_OUTPUT, index=False, encoding='utf-8-sig')
-        print(f"✅ Data saved to {config.CSV_OUTPUT}")
+        files = export_parquet(open_store().records_by_id(session_ids), config.PARQUET_DIR)
+        print(f"✅ Parquet: {len(session_ids)} records in {len(files)} partition file(s) under {config.PARQUET_DIR}")
     except Exception as e:
-        print(f"Error saving CSV: {e}")
-    
-    # Save to Excel
-    try:
-        df.to_excel(config.EXCEL_OUTPUT, index=False)
-        print(f"✅ Data saved to {config.EXCEL_OUTPUT}")
-    except Exception as e:
-        print(f"Error saving Excel: {e}")
+        print(f"Error saving Parquet: {e}")
 
 
-async def wait_for_element(page, selector, timeout=30000, retries=3):
-    """Wait for element with retry logic"""
-    for attempt in range(retries):
-        try:
-            await page.wait_for_selector(selector, timeout=timeout)
-            return True
-        except PlaywrightTimeoutError:
-            if attempt < retries - 1:
-                print(f"Element {selector} not found, retrying ({attempt + 1}/{retries})...")
-                await page.wait_for_timeout(2000)
-                continue
-            else:
-                print(f"Element {selector} not found after {retries} attempts")
-                return False
-    return False
+async def perform_search(page, query=None):
+    """Perform search with retry logic"""
+    with metrics.timer("search"):
+        return await _perform_search(page, query or config.SEARCH)
 
 
-async def perform_search(page):
-    """Perform search with retry logic"""
+async def _perform_search(page, query):
     for attempt in range(3):
         try:
             print(f"Attempting search (attempt {attempt + 1}/3)...")
             
             # Clear and type search
-            search_box = page.locator('#searchboxinput')
-            await search_box.wait_for(state="visible", timeout=10000)
+            search_box, _ = await open_selector_registry().locate(page, "search_box", timeout=10000)
+            if search_box is None:
+                metrics.inc("timeouts", stage="search_box")
+                raise Exception("Search box not found")
             await search_box.click()
             await search_box.fill("")
-            await search_box.type(config.SEARCH, delay=random.uniform(50, 150))
+            await search_box.type(query, delay=random.uniform(50, 150))
             
             # Press Enter
             await page.keyboard.press("Enter")
             
-            # Wait for results
-            await page.wait_for_timeout(random.randint(3000, 6000))
-            
-            # Check if results appeared
+            # Wait for results to appear
             results = page.locator("div[role='article']")
             await results.first.wait_for(state="visible", timeout=15000)
             
@@ -321,8 +748,12 @@ async def perform_search(page):
                 
         except Exception as e:
             print(f"Search attempt {attempt + 1} failed: {e}")
+            metrics.inc("retries", stage="search")
+            if is_timeout(e):
+                metrics.inc("timeouts", stage="search")
             if attempt < 2:
-                await page.wait_for_timeout(3000)
+                pacer.throttled("search failed")
+                await pacer.pause()
                 continue
     
     print("❌ Search failed after 3 attempts")
@@ -331,292 +762,448 @@ async def perform_search(page):
 
 async def get_scrollable_panel(page):
     """Find and return the scrollable panel containing business results"""
-    # Try multiple selectors for the scrollable panel
-    scrollable_selectors = [
-        'div[role="feed"]',  # Primary selector for Google Maps results
-        '.m6QErb[aria-label*="Results for"]',  # Another common selector
-        '.m6QErb.DxyBCb',  # Alternative class
-        'div[aria-label*="Results"]',  # Generic results container
-    ]
-    
-    for selector in scrollable_selectors:
-        try:
-            panel = page.locator(selector).first
-            if await panel.count() > 0:
-                await panel.wait_for(state="visible", timeout=5000)
-                print(f"✅ Found scrollable panel with selector: {selector}")
-                
-                # Try to get bounding box to confirm it's visible
-                bbox = await panel.bounding_box()
-                if bbox:
-                    print(f"Panel position: x={bbox['x']}, y={bbox['y']}, width={bbox['width']}, height={bbox['height']}")
-                    return panel
-        except:
-            continue
+    # One wait covers every candidate in the registry, so stale fallbacks cost nothing
+    panel, selector = await open_selector_registry().locate(page, "feed", timeout=5000)
+    if panel:
+        print(f"✅ Found scrollable panel with selector: {selector}")
+        
+        # Try to get bounding box to confirm it's visible
+        bbox = await panel.bounding_box()
+        if bbox:
+            print(f"Panel position: x={bbox['x']}, y={bbox['y']}, width={bbox['width']}, height={bbox['height']}")
+            return panel
     
+    metrics.inc("timeouts", stage="feed")
     print("⚠️ Could not find specific scrollable panel, using page scroll")
     return None
 
 
+# Outcomes of one scroll of the results feed
+LOADED = "loaded"        # new cards arrived
+EXHAUSTED = "exhausted"  # the end-of-list marker is showing
+BLOCKED = "blocked"      # a captcha page replaced the results
+STALLED = "stalled"      # nothing changed before the timeout
+
+# Polled by wait_for_function until it returns a status instead of false
+FEED_STATE_JS = """
+(previousCount) => {
+    if (location.href.includes("/sorry/")) return "blocked";
+    if (document.querySelectorAll("div[role='article']").length > previousCount) return "loaded";
+    const feed = document.querySelector("div[role='feed']");
+    if (!feed) return false;
+    if (feed.querySelector("span.HlvSq, .PbZDve")) return "exhausted";
+    const last = feed.lastElementChild;
+    if (last && /reached the end of the list/i.test(last.innerText || "")) return "exhausted";
+    return false;
+}
+"""
+
+SCROLL_TO_BOTTOM_JS = "element => { element.scrollTop = element.scrollHeight; }"
+
+# Back up one screen and return to the bottom, which makes Maps re-check the list end
+NUDGE_FEED_JS = """
+async (element) => {
+    element.scrollTop = Math.max(0, element.scrollHeight - 2 * element.clientHeight);
+    await new Promise((resolve) => setTimeout(resolve, 300));
+    element.scrollTop = element.scrollHeight;
+}
+"""
+
+
+async def wait_for_feed(page, previous_count, timeout=None):
+    """Wait until the feed grows past `previous_count`, ends or is blocked; return the status"""
+    async with pacer.waiting():
+        with metrics.timer("card_growth_wait"):
+            try:
+                handle = await page.wait_for_function(
+                    FEED_STATE_JS, arg=previous_count, timeout=timeout or config.GROWTH_TIMEOUT
+                )
+                return await handle.json_value()
+            except Exception:
+                metrics.inc("timeouts", stage="card_growth")
+                return STALLED
+
+
+async def scroll_feed_to_bottom(page, panel):
+    if panel:
+        await panel.evaluate(SCROLL_TO_BOTTOM_JS)
+    else:
+        await page.mouse.wheel(0, 5000)
+
+
+class Blocked(Exception):
+    """A captcha page replaced Maps; the attempt is over and its session cools down"""
+
+
+async def check_for_block(page):
+    """Back off on consent/captcha interstitials; a captcha aborts the attempt"""
+    if "/sorry/" in page.url:
+        pacer.throttled("captcha")
+        raise Blocked("Blocked by a captcha page")
+    if "consent.google." in page.url:
+        pacer.throttled("consent page")
+
+
 async def scroll_to_load_more(page, panel=None):
-    """Scroll to load more business cards"""
+    """Scroll the feed to its true bottom and wait; return LOADED, EXHAUSTED, BLOCKED or STALLED"""
+    with metrics.timer("scroll"):
+        return await _scroll_to_load_more(page, panel)
+
+
+async def _scroll_to_load_more(page, panel):
+    try:
+        previous_count = await page.locator("div[role='article']").count()
+        await scroll_feed_to_bottom(page, panel)
+        started = time.time()
+        status = await wait_for_feed(page, previous_count)
+    except Exception as e:
+        print(f"Error during scroll: {e}")
+        status = STALLED
+    
+    metrics.inc("scrolls", status=status)
+    if status == LOADED:
+        pacer.success(time.time() - started)
+    elif status == BLOCKED:
+        pacer.throttled("captcha")
+    elif status == STALLED:
+        pacer.throttled("empty feed")
+    return status
+
+
+async def nudge_feed(page, panel):
+    """Scroll up a little and back down to retrigger loading of a stalled feed"""
     try:
         if panel:
-            # Get panel position and move mouse to it
-            bbox = await panel.bounding_box()
-            if bbox:
-                # Move mouse to the center of the panel
-                center_x = bbox['x'] + bbox['width'] / 2
-                center_y = bbox['y'] + bbox['height'] / 2
-                await page.mouse.move(center_x, center_y)
-                await page.wait_for_timeout(1000)
-                
-                # Scroll within the panel
-                scroll_amount = random.randint(300, 800)
-                await page.mouse.wheel(0, scroll_amount)
-                print(f"Scrolled panel by {scroll_amount}px")
-            else:
-                # Fallback to page scroll
-                await page.mouse.wheel(0, random.randint(300, 800))
+            await panel.evaluate(NUDGE_FEED_JS)
         else:
-            # Scroll the entire page
-            await page.mouse.wheel(0, random.randint(300, 800))
-        
-        # Wait for new content to load
-        await page.wait_for_timeout(random.randint(2000, 4000))
-        
-        # Check if we're at the bottom (end of results)
-        if panel:
-            try:
-                scroll_height = await panel.evaluate('element => element.scrollHeight')
-                scroll_top = await panel.evaluate('element => element.scrollTop')
-                client_height = await panel.evaluate('element => element.clientHeight')
-                
-                # If we're near the bottom (within 100px)
-                if scroll_height - (scroll_top + client_height) < 100:
-                    print("⚠️  Near bottom of results")
-                    return False
-            except:
-                pass
-        
-        return True
-        
+            await page.mouse.wheel(0, -800)
+            await page.mouse.wheel(0, 5000)
     except Exception as e:
-        print(f"Error during scroll: {e}")
-        return False
+        print(f"Could not nudge the feed: {e}")
+
+
+async def fast_forward(page, panel, depth, max_idle=3):
+    """Scroll the feed straight down until it holds `depth` cards again (no extraction, no pauses)"""
+    with metrics.timer("fast_forward"):
+        return await _fast_forward(page, panel, depth, max_idle)
+
+
+async def _fast_forward(page, panel, depth, max_idle):
+    cards = page.locator("div[role='article']")
+    count = await cards.count()
+    idle = 0
+    print(f"Fast-forwarding feed to checkpoint depth {depth} (currently {count})...")
+    
+    while count < depth and idle < max_idle:
+        try:
+            await scroll_feed_to_bottom(page, panel)
+        except Exception:
+            pass
+        status = await wait_for_feed(page, count)
+        if status in (EXHAUSTED, BLOCKED):
+            break
+        idle = 0 if status == LOADED else idle + 1
+        count = await cards.count()
+        if config.PRUNE_CARDS:
+            await prune_cards(page)
+    
+    print(f"Fast-forward stopped at {count} cards")
+    return count
 
 
 # ------------------------
 # Main Runner
 # ------------------------
-async def run():
+def load_queries():
+    """Return the list of search queries to run (QUERIES_FILE, QUERIES or SEARCH)"""
+    queries = []
+    if config.QUERIES_FILE and os.path.exists(config.QUERIES_FILE):
+        with open(config.QUERIES_FILE, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    queries.append(line)
+    queries.extend(config.QUERIES)
+    if not queries:
+        queries.append(config.SEARCH)
+    
+    # Drop repeated queries but keep the original order
+    return list(dict.fromkeys(queries))
+
+
+# A unit of scheduled work: a typed search, or a search scoped to one map tile
+Job = namedtuple("Job", ["key", "query", "url", "tile", "target"])
+
+
+def make_job(query, tile=None):
+    """Build the job for a query, optionally limited to one tile"""
+    if tile is None:
+        return Job(query, query, None, None, config.TARGET)
+    return Job(f"{query} {tiling.label(tile)}", query, tiling.tile_url(config.BASE_URL, query, tile), tile, config.TILE_TARGET)
+
+
+def job_to_dict(job):
+    """Plain-data form of a job for the shared queue"""
+    return {"key": job.key, "query": job.query, "url": job.url,
+            "tile": list(job.tile) if job.tile else None, "target": job.target}
+
+
+def job_from_dict(data):
+    return Job(data["key"], data["query"], data["url"], tiling.Tile(*data["tile"]) if data["tile"] else None, data["target"])
+
+
+def load_jobs():
+    """Return the jobs to run: one per query, or one per query and tile when TILE_AREA is set"""
+    queries = load_queries()
+    if not config.TILE_AREA:
+        return [make_job(query) for query in queries]
+    
+    box = tiling.resolve_area(config.TILE_AREA, config.TILE_AREAS)
+    tiles = tiling.grid(box, config.TILE_GRID, config.TILE_GRID)
+    return [make_job(query, tile) for query in queries for tile in tiles]
+
+
+def child_jobs(job):
+    """Split a tile whose feed hit the result cap into four smaller tiles"""
+    if job.tile is None or job.tile.depth >= config.TILE_MAX_DEPTH:
+        return []
+    if job_card_counts.get(job.key, 0) < config.TILE_DENSE_CARDS:
+        return []
+    print(f"[{job.key}] Dense tile ({job_card_counts[job.key]} cards), splitting in four")
+    return [make_job(job.query, tile) for tile in tiling.subdivide(job.tile)]
+
+
+async def open_sessions(p, workers=None):
+    """Launch every configured browser session (see config.SESSIONS) and return the pool
+
+    workers is the number of pages leasing sessions at once (default: WORKERS)
+    and bounds the pages per session unless SESSION_PAGES is set.
+    """
+    global session_pool
+    session_pool = sessions.SessionPool(
+        sessions.build_sessions(config.SESSIONS, config.PROFILE_DIR, config.USER_AGENT, config.LOCALE, config.TIMEZONE_ID),
+        max_pages=config.SESSION_PAGES or workers or config.WORKERS,
+        cooldown=config.SESSION_COOLDOWN,
+        max_cooldown=config.SESSION_MAX_COOLDOWN,
+        min_score=config.SESSION_MIN_SCORE,
+        slow_load=config.SESSION_SLOW_LOAD,
+    )
+    await session_pool.start(p, headless=config.HEADLESS)
+    return session_pool
+
+
+async def open_search_url(page, url):
+    """Open a viewport-scoped search URL directly; return False if the area has no results"""
+    await page.goto(url, wait_until="domcontentloaded")
+    await check_for_block(page)
+    try:
+        await page.locator("div[role='article']").first.wait_for(state="visible", timeout=15000)
+        return True
+    except Exception:
+        return False
+
+
+async def scrape_query(page, job, tracker, recycle=True, session=None):
+    """Open the results for one job and scroll them until its target is met
+
+    With `recycle`, raises RecyclePage when the page grows past the memory limits.
+    The page load time counts towards `session`'s health score.
+    """
+    query = job.key
+    load_start = time.time()
+    
+    if job.url:
+        # Tiles go straight to their search URL - no warm-up or typing needed
+        print(f"[{query}] Opening tile search...")
+        with metrics.timer("open_tile"):
+            opened = await open_search_url(page, job.url)
+        if not opened:
+            print(f"[{query}] No results in this tile")
+            open_store().save_checkpoint(query, [], 0, query_counts[query], finished=True)
+            return
+    else:
+        # --------------------------------
+        # SESSION WARM-UP 
+        # --------------------------------
+        print(f"[{query}] Navigating to Google Maps...")
+        with metrics.timer("warmup"):
+            await page.goto(config.BASE_URL, wait_until="domcontentloaded")
+            await check_for_block(page)
+            
+            # Wait for the search box instead of a fixed pause
+            if (await open_selector_registry().locate(page, "search_box", timeout=config.PAGE_TIMEOUT))[0] is None:
+                metrics.inc("timeouts", stage="warmup")
+                raise Exception("Search box did not appear")
+            
+            # Human-like interactions
+            await page.mouse.move(400, 300)
+            await page.mouse.wheel(0, 200)
+            await pacer.pause()
+        
+        # Perform search with retry
+        if not await perform_search(page, job.query):
+            raise Exception("Search failed")
+    page_load_times.append(time.time() - load_start)
+    metrics.observe("page_load_seconds", page_load_times[-1])
+    if session:
+        session.loaded(page_load_times[-1])
+    
+    # Find the scrollable panel
+    scroll_panel = await get_scrollable_panel(page)
+    
+    # Resume from the depth a previous attempt or run reached
+    checkpoint = open_store().load_checkpoint(query)
+    if checkpoint and checkpoint["depth"] > 0:
+        # Key the cards as they come back so the fast-forward can prune them
+        await tracker.install(page)
+        await fast_forward(page, scroll_panel, checkpoint["depth"])
+    
+    # Main scraping loop: scrape what is loaded, then scroll to the true bottom for more
+    stalls = 0
+    iteration = 0
+    
+    while query_counts[query] < job.target:
+        await check_for_block(page)
+        
+        # Scrape current businesses
+        await scrape_current_businesses(page, tracker, job)
+        
+        # Keep the feed's DOM flat, and move to a fresh page if memory still climbs
+        iteration += 1
+        if config.PRUNE_CARDS:
+            await prune_cards(page)
+        if recycle and iteration % config.MEMORY_CHECK_EVERY == 0:
+            await check_memory(page)
+        
+        # Check if we reached target
+        if query_counts[query] >= job.target:
+            print(f"\n✅ [{query}] Reached target of {job.target} unique businesses!")
+            break
+        
+        status = await scroll_to_load_more(page, scroll_panel)
+        
+        if status == EXHAUSTED:
+            # Cards rendered together with the end marker are still unread
+            await scrape_current_businesses(page, tracker, job)
+            print(f"🏁 [{query}] End of the list reached after {tracker.card_count} cards")
+            break
+        
+        if status == BLOCKED:
+            raise Blocked("Blocked by a captcha page while scrolling")
+        
+        if status == STALLED:
+            stalls += 1
+            print(f"No new cards after scrolling (stalled {stalls}/{config.SCROLL_MAX_STALLS})")
+            if stalls >= config.SCROLL_MAX_STALLS:
+                print("Feed stopped growing without an end-of-list marker. Stopping.")
+                break
+            await nudge_feed(page, scroll_panel)
+        else:
+            stalls = 0
+        
+        # Adaptive delay between actions
+        await pacer.pause()
+        
+        # Human-like mouse movement (within the panel if available)
+        if random.random() > 0.7:
+            if scroll_panel:
+                try:
+                    bbox = await scroll_panel.bounding_box()
+                    if bbox:
+                        await page.mouse.move(
+                            random.randint(int(bbox['x']), int(bbox['x'] + bbox['width'])),
+                            random.randint(int(bbox['y']), int(bbox['y'] + bbox['height']))
+                        )
+                except:
+                    # Fallback to general area
+                    await page.mouse.move(
+                        random.randint(100, 700),
+                        random.randint(100, 500)
+                    )
+            else:
+                await page.mouse.move(
+                    random.randint(100, 700),
+                    random.randint(100, 500)
+                )
+    
+    # Nothing left to resume for this query
+    open_store().save_checkpoint(query, [], tracker.card_count, query_counts[query], finished=True)
+    
+    # Take final screenshot
+    try:
+        await page.screenshot(path="final_results.png", full_page=True)
+        print("✅ Final screenshot saved")
+    except:
+        pass
+
+
+async def run_query(pool, job):
+    """Run one job on its own page, retrying up to MAX_RETRIES times
+
+    Every attempt leases the healthiest session of the pool, so a retry after a
+    block usually moves to another profile/proxy.
+    """
+    query = job.key
     retries = 0
+    recycles = 0
+    
+    # Survives retries so cards processed in an earlier attempt are not re-walked
+    tracker = new_tracker()
+    
+    checkpoint = open_store().load_checkpoint(query)
+    if checkpoint and checkpoint["finished"] and checkpoint["age"] > config.FINISHED_CHECKPOINT_HOURS * 3600:
+        print(f"[{query}] Finished in an earlier round ({checkpoint['last_batch_at']} UTC), scraping it again")
+        open_store().clear_checkpoint(query)
+        checkpoint = None
+    if checkpoint and not config.RESUME:
+        open_store().clear_checkpoint(query)
+    elif checkpoint and checkpoint["finished"]:
+        print(f"[{query}] Already finished in a previous run (checkpoint {checkpoint['last_batch_at']}), skipping")
+        query_counts.setdefault(query, 0)
+        job_card_counts[query] = checkpoint["depth"]
+        return True
+    elif checkpoint:
+        print(f"[{query}] Resuming: {len(checkpoint['keys'])} cards processed, feed depth {checkpoint['depth']}")
+        tracker.seen_keys.update(checkpoint["keys"])
+        query_counts[query] = checkpoint["added"]
+    query_counts.setdefault(query, 0)
     
     while retries < config.MAX_RETRIES:
+        page = None
+        session = await pool.lease()
+        outcome = sessions.FAILED
         try:
             print(f"\n{'='*50}")
-            print(f"Starting scraping session (Attempt {retries + 1}/{config.MAX_RETRIES})")
-            print(f"Target: {config.TARGET} unique businesses")
+            print(f"Starting query: {query} (Attempt {retries + 1}/{config.MAX_RETRIES}) on session {session.label()}")
+            print(f"Target: {job.target} unique businesses")
             print(f"{'='*50}")
             
-            # Clear seen URLs at start of each retry to avoid stale data
-            seen_urls.clear()
+            page = await session.context.new_page()
+            
+            # Set default timeout
+            page.set_default_timeout(config.PAGE_TIMEOUT)
+            tracker.attach(page)
+            
+            await scrape_query(page, job, tracker, recycle=recycles < config.MAX_RECYCLES, session=session)
+            job_card_counts[query] = tracker.card_count
+            outcome = sessions.OK
+            print(f"✅ [{query}] Finished with {query_counts[query]} new records")
+            return True
+        
+        except RecyclePage as e:
+            # Not a failure: the checkpoint lets a fresh page pick up where this one stopped
+            outcome = sessions.OK
+            recycles += 1
+            metrics.inc("page_recycles")
+            print(f"♻️  [{query}] Recycling the page ({e}); resuming from the checkpoint")
+            await writer.flush()
             
-            async with async_playwright() as p:
-                # Launch browser with persistent context
-                context = await p.chromium.launch_persistent_context(
-                    user_data_dir=config.PROFILE_DIR,
-                    headless=False,
-                    args=[
-                        "--disable-blink-features=AutomationControlled",
-                        "--start-maximized",
-                        "--disable-infobars",
-                        "--disable-notifications",
-                        "--no-sandbox",
-                        "--disable-dev-shm-usage",
-                    ],
-                    viewport=None,
-                    locale="en-MY",
-                    timezone_id="Asia/Kuala_Lumpur",
-                    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                )
-                
-                # Use existing tab or create one
-                if context.pages:
-                    page = context.pages[0]
-                else:
-                    page = await context.new_page()
-                
-                # Set default timeout
-                page.set_default_timeout(config.PAGE_TIMEOUT)
-                
-                # --------------------------------
-                # SESSION WARM-UP 
-                # --------------------------------
-                print("Navigating to Google Maps...")
-                await page.goto(config.BASE_URL, wait_until="domcontentloaded")
-                
-                # Human-like interactions
-                await page.wait_for_timeout(random.randint(3000, 6000))
-                await page.mouse.move(400, 300)
-                await page.wait_for_timeout(1000)
-                await page.mouse.wheel(0, 200)
-                await page.wait_for_timeout(random.randint(2000, 4000))
-                
-                # Perform search with retry
-                if not await perform_search(page):
-                    raise Exception("Search failed")
-                
-                # Find the scrollable panel
-                scroll_panel = await get_scrollable_panel(page)
-                
-                # Initial scroll to load more results
-                print("Performing initial scrolls to load more results...")
-                for i in range(3):
-                    print(f"Initial scroll {i+1}/3...")
-                    await scroll_to_load_more(page, scroll_panel)
-                    await page.wait_for_timeout(random.randint(1500, 3000))
-                
-                # Main scraping loop
-                stuck_counter = 0
-                max_stuck_attempts = 8
-                no_new_data_counter = 0
-                last_card_count = 0
-                
-                while len(data) < config.TARGET:
-                    # Get current card count before scraping
-                    business_cards = page.locator("div[role='article']")
-                    current_card_count = await business_cards.count()
-                    
-                    # Scrape current businesses
-                    new_scraped = await scrape_current_businesses(page)
-                    
-                    # Check if we reached target
-                    if len(data) >= config.TARGET:
-                        print(f"\n✅ Reached target of {config.TARGET} unique businesses!")
-                        break
-                    
-                    # Check if we're stuck (no new cards loaded)
-                    if current_card_count == last_card_count:
-                        no_new_data_counter += 1
-                        print(f"No new cards loaded (counter: {no_new_data_counter}/3)")
-                    else:
-                        no_new_data_counter = 0
-                    
-                    last_card_count = current_card_count
-                    
-                    # Check if we're stuck (no new unique businesses scraped)
-                    if new_scraped == 0:
-                        stuck_counter += 1
-                        print(f"No new unique businesses scraped (stuck: {stuck_counter}/{max_stuck_attempts})")
-                        
-                        if stuck_counter >= max_stuck_attempts:
-                            print("Too many attempts without new unique businesses. Stopping.")
-                            break
-                        
-                        # Try different strategies when stuck
-                        print("Trying alternative scrolling strategies...")
-                        
-                        # Strategy 1: Scroll more aggressively
-                        if scroll_panel:
-                            try:
-                                # Scroll to a specific business card
-                                cards = page.locator("div[role='article']")
-                                if await cards.count() > 5:
-                                    last_card = cards.nth(await cards.count() - 3)
-                                    await last_card.scroll_into_view_if_needed()
-                                    print("Scrolled to last business card")
-                            except:
-                                pass
-                        
-                        # Strategy 2: Scroll in larger increments
-                        for _ in range(2):
-                            await scroll_to_load_more(page, scroll_panel)
-                            await page.wait_for_timeout(random.randint(2000, 4000))
-                        
-                        # Strategy 3: Try clicking on a business card to trigger loading
-                        if random.random() > 0.5:
-                            try:
-                                cards = page.locator("div[role='article']")
-                                if await cards.count() > 3:
-                                    random_card = cards.nth(random.randint(0, await cards.count() - 1))
-                                    await random_card.click()
-                                    await page.wait_for_timeout(2000)
-                                    
-                                    # Click back on the list
-                                    if scroll_panel:
-                                        bbox = await scroll_panel.bounding_box()
-                                        if bbox:
-                                            await page.mouse.click(bbox['x'] + 50, bbox['y'] + 50)
-                                            await page.wait_for_timeout(1000)
-                                    print("Clicked on random business card to trigger loading")
-                            except:
-                                pass
-                    else:
-                        stuck_counter = 0  # Reset counter if we got new data
-                    
-                    # Regular scroll to load more content
-                    print("Scrolling to load more businesses...")
-                    scroll_success = await scroll_to_load_more(page, scroll_panel)
-                    
-                    if not scroll_success:
-                        print("⚠️  May have reached end of results")
-                        stuck_counter += 1
-                        if stuck_counter >= 3:
-                            print("End of results reached. Stopping.")
-                            break
-                    
-                    # Random delay between actions
-                    delay = random.uniform(1.5, 4)
-                    await page.wait_for_timeout(int(delay * 1000))
-                    
-                    # Human-like mouse movement (within the panel if available)
-                    if random.random() > 0.7:
-                        if scroll_panel:
-                            try:
-                                bbox = await scroll_panel.bounding_box()
-                                if bbox:
-                                    await page.mouse.move(
-                                        random.randint(int(bbox['x']), int(bbox['x'] + bbox['width'])),
-                                        random.randint(int(bbox['y']), int(bbox['y'] + bbox['height']))
-                                    )
-                            except:
-                                # Fallback to general area
-                                await page.mouse.move(
-                                    random.randint(100, 700),
-                                    random.randint(100, 500)
-                                )
-                        else:
-                            await page.mouse.move(
-                                random.randint(100, 700),
-                                random.randint(100, 500)
-                            )
-                
-                # Save data
-                await save_data()
-                
-                # Take final screenshot
-                try:
-                    await page.screenshot(path="final_results.png", full_page=True)
-                    print("✅ Final screenshot saved")
-                except:
-                    pass
-                
-                # Close context
-                await context.close()
-                
-                print(f"\n{'='*50}")
-                print(f"Scraping completed successfully!")
-                print(f"Total unique records: {len(data)}")
-                print(f"Total duplicates skipped: {len(seen_urls) - len(data)}")
-                print(f"Output files: {config.CSV_OUTPUT}, {config.EXCEL_OUTPUT}")
-                print(f"{'='*50}")
-                
-                break  # Exit retry loop on success
-                
         except Exception as e:
+            if isinstance(e, Blocked):
+                outcome = sessions.BLOCKED
             retries += 1
-            print(f"\n❌ Error occurred (Attempt {retries}/{config.MAX_RETRIES}): {str(e)}")
+            metrics.inc("retries", stage="query")
+            print(f"\n❌ [{query}] Error occurred (Attempt {retries}/{config.MAX_RETRIES}): {str(e)}")
             
             # Save error screenshot
             try:
@@ -626,31 +1213,349 @@ async def run():
                 pass
             
             # Save any scraped data so far
-            if data:
-                await save_data()
+            await writer.flush()
             
             if retries < config.MAX_RETRIES:
                 print(f"Retrying in 10 seconds...")
                 await asyncio.sleep(10)
             else:
-                print(f"Max retries reached. Exiting.")
-                raise
+                print(f"[{query}] Max retries reached. Giving up on this query.")
+        finally:
+            if page:
+                try:
+                    await page.close()
+                except:
+                    pass
+            await pool.release(session, outcome)
+    
+    return False
+
+
+async def run(jobs=None):
+    """Run every job across a bounded pool of pages on the leased browser sessions"""
+    from playwright.async_api import async_playwright
+    
+    run_started = time.perf_counter()
+    load_existing_data()
+    open_store().heartbeat()
+    recover_unwritten(include_own=True)
+    report_startup()
+    
+    # Background tasks for the run: the store heartbeat, and live export to a Prometheus file and/or endpoint
+    exporters = [asyncio.create_task(keep_writer_alive())]
+    if config.METRICS_PROM_FILE:
+        exporters.append(asyncio.create_task(metrics.export_every(config.METRICS_PROM_FILE, config.METRICS_INTERVAL)))
+    server = None
+    if config.METRICS_PORT:
+        server = await metrics.serve(config.METRICS_PORT)
+        print(f"📈 Metrics at http://127.0.0.1:{config.METRICS_PORT}/metrics")
+    
+    jobs = jobs or load_jobs()
+    workers = max(1, min(config.WORKERS, len(jobs)))
+    print(f"Scheduling {len(jobs)} jobs on {workers} worker page(s)")
+    
+    async with async_playwright() as p:
+        # Launch every browser session up front
+        # Enrichment workers lease sessions next to the scraping pages
+        pool = await open_sessions(p, config.WORKERS + (config.ENRICH_WORKERS if config.ENRICH else 0))
+        writer.start()
+        
+        # Detail pages are read alongside scrolling, on their own worker pages
+        global enrichment
+        if config.ENRICH:
+            enrichment = EnrichmentPool(
+                pool,
+                finish_enriched,
+                workers=config.ENRICH_WORKERS,
+                min_interval=config.ENRICH_MIN_INTERVAL,
+                timeout=config.PAGE_TIMEOUT,
+                cache=open_cache(),
+                max_pending=config.ENRICH_MAX_PENDING,
+            )
+            await enrichment.start()
+        
+        # Block the resources the results feed does not need
+        blocker = RequestBlocker(config.BLOCK_PROFILE)
+        for context in pool.contexts():
+            await blocker.install(context)
+        
+        # Each worker runs one job at a time on its own page; dense tiles queue their sub-tiles
+        queue = asyncio.Queue()
+        results = {}
+        
+        # Shared mode: every node offers the same jobs, existing keys are ignored
+        jobqueue = None
+        if config.QUEUE_PATH:
+            jobqueue = JobQueue(config.QUEUE_PATH, config.QUEUE_LEASE_SECONDS, config.QUEUE_MAX_ATTEMPTS, worker_id)
+            added = jobqueue.enqueue([job_to_dict(job) for job in jobs])
+            print(f"Shared job queue {config.QUEUE_PATH}: {added} new jobs, worker {jobqueue.worker_id}")
+        else:
+            for job in jobs:
+                queue.put_nowait(job)
+        
+        async def worker():
+            while True:
+                job = await queue.get()
+                try:
+                    with metrics.timer("job"):
+                        results[job] = await run_query(pool, job)
+                    metrics.inc("jobs", result="ok" if results[job] else "failed")
+                    if results[job]:
+                        for child in child_jobs(job):
+                            queue.put_nowait(child)
+                except Exception as e:
+                    results[job] = False
+                    print(f"[{job.key}] Unexpected error: {e}")
+                finally:
+                    queue.task_done()
+        
+        async def keep_lease(job):
+            while True:
+                await asyncio.sleep(config.QUEUE_HEARTBEAT)
+                if not jobqueue.heartbeat(job.key):
+                    print(f"⚠️  [{job.key}] Lease lost to another worker; its records are still deduplicated")
+                    return
+        
+        async def shared_worker():
+            # Claim jobs until no node has any queued or running - a running job may still add tiles
+            while True:
+                claimed = jobqueue.claim()
+                if claimed is None:
+                    if not jobqueue.active():
+                        return
+                    await asyncio.sleep(config.QUEUE_POLL_INTERVAL)
+                    continue
+                job = job_from_dict(claimed)
+                heartbeat = asyncio.create_task(keep_lease(job))
+                ok = False
+                try:
+                    with metrics.timer("job"):
+                        ok = await run_query(pool, job)
+                    if ok:
+                        jobqueue.enqueue([job_to_dict(child) for child in child_jobs(job)])
+                except Exception as e:
+                    print(f"[{job.key}] Unexpected error: {e}")
+                finally:
+                    heartbeat.cancel()
+                    state = jobqueue.finish(job.key, ok)
+                    metrics.inc("jobs", result="ok" if ok else "failed")
+                    if state == "queued":
+                        print(f"[{job.key}] Re-queued for another attempt")
+                    else:
+                        results[job] = ok
+        
+        tasks = [asyncio.create_task(shared_worker() if jobqueue else worker()) for _ in range(workers)]
+        if jobqueue:
+            # Shared workers return once no node has a queued or leased job left
+            await asyncio.gather(*tasks)
+        else:
+            await queue.join()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        # Let the enrichment pool finish what the queries queued
+        if enrichment:
+            await enrichment.close()
+        
+        if jobqueue:
+            print(jobqueue.summary())
+            jobqueue.close()
+        
+        # Save data
+        await save_data()
+        
+        # Close the browsers
+        await pool.close()
+    
+    metrics.observe("stage_seconds", time.perf_counter() - run_started, stage="run")
+    if selector_registry:
+        selector_registry.save()
+    for task in exporters:
+        task.cancel()
+    if server:
+        server.close()
+    write_metrics()
+    
+    # Per-query totals (tiles of the same query are added up)
+    totals = {}
+    for job in results:
+        count, tiles = totals.get(job.query, (0, 0))
+        totals[job.query] = (count + query_counts.get(job.key, 0), tiles + (job.tile is not None))
+    
+    print(f"\n{'='*50}")
+    print(f"Scraping completed: {sum(results.values())}/{len(results)} jobs succeeded")
+    for query, (count, tiles) in totals.items():
+        print(f"  {query}: {count} new records" + (f" from {tiles} tiles" if tiles else ""))
+    print(f"New unique records: {len(session_ids)} (total in store: {open_store().count()})")
+    print(blocker.summary(sum(query_counts.values())))
+    print(pacer.summary())
+    print(pool.summary())
+    if enrichment:
+        print(enrichment.summary())
+    print(open_store().dedup.summary())
+    if selector_registry:
+        print(selector_registry.summary())
+    if place_cache:
+        print(place_cache.summary())
+    if page_load_times:
+        print(f"Average page load (navigation to results): {sum(page_load_times) / len(page_load_times):.1f}s")
+    print(metrics.summary())
+    print(f"Output files: {config.CSV_OUTPUT}, {config.EXCEL_OUTPUT}")
+    print(f"{'='*50}")
+    
+    failed = [job.key for job, ok in results.items() if not ok]
+    if failed:
+        raise Exception(f"{len(failed)} jobs failed: {', '.join(failed)}")
+
+
+async def run_refresh():
+    """Revisit the place pages of stale stored records and record what changed"""
+    from playwright.async_api import async_playwright
+    
+    run_started = time.perf_counter()
+    load_existing_data()
+    report_startup()
+    
+    cutoff = time.time() - config.REFRESH_MAX_AGE_DAYS * 86400
+    with_page, by_name, skipped = open_store().count_stale(cutoff)
+    stale = with_page + (by_name if config.REFRESH_BY_NAME else 0)
+    total = min(stale, config.REFRESH_LIMIT) if config.REFRESH_LIMIT else stale
+    print(f"🔄 {with_page + by_name + skipped} of {store.count()} records were last scraped before "
+          f"{export_value('scraped_at', cutoff)}; refreshing {total}")
+    if by_name:
+        if config.REFRESH_BY_NAME:
+            print(f"   {by_name} of them have no Place URL and are looked up by name + address")
+        else:
+            print(f"   Skipping {by_name} without a Place URL (REFRESH_BY_NAME is off)")
+    if skipped:
+        print(f"   Skipping {skipped} with neither a Place URL nor a business name")
+    if not total:
+        return
+    
+    refresh_log = RefreshLog(config.REFRESH_DIFFS)
+    refresh_writer = RecordWriter(config.REFRESH_OUTPUT, None, config.FLUSH_INTERVAL)
+    refreshed_ids = array("q")
+    previous_times = {}
+    
+    def finish_refreshed(record_id, record, changes):
+        previous = previous_times.pop(record_id, None)
+        if changes is None:
+            # Page not read: the stored record keeps its old time and is retried next refresh
+            refresh_log.failed += 1
+            metrics.inc("refreshed", result="failed")
+            return
+        refresh_log.write(record_id, record, changes, previous)
+        metrics.inc("refreshed", result="changed" if changes else "unchanged")
+        for field in changes:
+            metrics.inc("refresh_changes", field=field)
+        store.update(record_id, record)
+        refresh_writer.write(record)
+        refreshed_ids.append(record_id)
+    
+    async with async_playwright() as p:
+        # Each detail page leases the healthiest session with a free page
+        await open_sessions(p, config.REFRESH_WORKERS)
+        refresh_writer.start()
+        blocker = RequestBlocker(config.BLOCK_PROFILE)
+        for context in session_pool.contexts():
+            await blocker.install(context)
+        pool = EnrichmentPool(
+            session_pool,
+            finish_refreshed,
+            workers=config.REFRESH_WORKERS,
+            min_interval=config.REFRESH_MIN_INTERVAL,
+            timeout=config.PAGE_TIMEOUT,
+            cache=open_cache(),
+            merge=refresh_record,
+            label="Refreshed",
+        )
+        await pool.start()
+        
+        try:
+            # One batch in flight at a time keeps memory flat however many records are stale
+            submitted = 0
+            after_id = 0
+            while submitted < total:
+                batch = store.stale_records(cutoff, after_id, min(config.REFRESH_BATCH, total - submitted),
+                                            searchable=config.REFRESH_BY_NAME)
+                if not batch:
+                    break
+                for record_id, record in batch:
+                    previous_times[record_id] = record.scraped_at
+                    if not (record.place_url or "").startswith("http"):
+                        record.place_url = search_url(record)
+                    pool.submit(record_id, record)
+                after_id = batch[-1][0]
+                submitted += len(batch)
+                with metrics.timer("refresh_batch"):
+                    await pool.wait()
+                print(f"🔄 Refreshed {submitted}/{total} ({refresh_log.changed} changed, {refresh_log.failed} failed)")
+            await pool.close()
+            await refresh_writer.close()
+        finally:
+            # Also reached on Ctrl+C: the store is already up to date, finish the output file
+            refresh_writer.flush_sync()
+        
+        if config.PARQUET_DIR and refreshed_ids:
+            try:
+                files = export_parquet(store.records_by_id(refreshed_ids), config.PARQUET_DIR)
+                print(f"✅ Parquet: {len(refreshed_ids)} refreshed records in {len(files)} partition file(s)")
+            except Exception as e:
+                print(f"Error saving Parquet: {e}")
+        
+        await session_pool.close()
+    
+    metrics.observe("stage_seconds", time.perf_counter() - run_started, stage="refresh")
+    write_metrics()
+    
+    print(f"\n{'='*50}")
+    print(refresh_log.summary())
+    print(blocker.summary(refresh_log.refreshed))
+    if place_cache:
+        print(place_cache.summary())
+    print(metrics.summary())
+    print(f"Output files: {config.REFRESH_OUTPUT}, {config.REFRESH_DIFFS}")
+    print(f"{'='*50}")
+
+
+def write_metrics():
+    """Write the end-of-run metrics files"""
+    try:
+        if config.METRICS_JSON:
+            metrics.write_json(config.METRICS_JSON)
+        if config.METRICS_PROM_FILE:
+            metrics.write_prometheus(config.METRICS_PROM_FILE)
+    except Exception as e:
+        print(f"Could not write metrics: {e}")
+
+
+startup_times["import"] = time.perf_counter() - _import_started
 
 
 if __name__ == "__main__":
     start_time = time.time()
     
     try:
-        asyncio.run(run())
+        asyncio.run(run_refresh() if config.REFRESH else run())
     except KeyboardInterrupt:
         print("\n\n⚠️  Scraping interrupted by user")
-        if data:
-            df = pd.DataFrame(data)
-            df.to_csv(config.CSV_OUTPUT, index=False)
-            df.to_excel(config.EXCEL_OUTPUT, index=False)
-            print(f"✅ Saved {len(data)} unique records before exit")
+        # Records still queued for enrichment are written without the extra fields
+        if enrichment:
+            for record_id, record in enrichment.pending_records():
+                writer.write(record, record_id)
+        writer.flush_sync()
+        if writer.written:
+            if config.PARQUET_DIR:
+                export_session_parquet()
+            writer.export_excel_sync(config.EXCEL_OUTPUT)
+            print(f"✅ Saved {writer.written} new records before exit")
+        if selector_registry:
+            selector_registry.save()
+        write_metrics()
     except Exception as e:
         print(f"\n❌ Fatal error: {e}")
+        write_metrics()
     
     end_time = time.time()
     print(f"\n⏱️  Total execution time: {end_time - start_time:.2f} seconds")
\ No newline at end of file
@@ -0,0 +1,161 @@
+import json
+import os
+import time
+
+# Ordered candidates per field; the first that matches wins and is tried first from then on
+CANDIDATES = {
+    # Parts of a result card (resolved in the page by CARD_TRACKER_JS)
+    "container": [".UaQhfb.fontBodyMedium", ".UaQhfb", "div.bfdHYd"],
+    "name": [".qBF1Pd.fontHeadlineSmall", ".qBF1Pd", ".fontHeadlineSmall"],
+    "info": [".W4Efsd span", ".W4Efsd"],
+    "website": ["a.lcr4fd", "a[data-value='Website']", "a[aria-label*='website' i]"],
+    "place_link": ["a[href*='/maps/place/']", "a.hfpxzc"],
+    "rating": [".MW4etd", "span.ZkP5Je span[aria-hidden='true']"],
+    "reviews": [".UY7F9", "span.ZkP5Je span[aria-label*='review' i]"],
+    "phone": ["button[data-item-id*='phone']", ".UsdlK"],
+    # Page-level elements (resolved with SelectorRegistry.locate)
+    "feed": ["div[role='feed']", ".m6QErb[aria-label*='Results for']", ".m6QErb.DxyBCb", "div[aria-label*='Results']"],
+    "search_box": ["#searchboxinput", "input[name='q']", "input[aria-label*='Search Google Maps' i]"],
+}
+
+CARD_FIELDS = ["container", "name", "info", "website", "place_link", "rating", "reviews", "phone"]
+
+# In-page helper for locate(): highest-priority candidate that matches a rendered element
+PICK_VISIBLE_JS = """
+(candidates) => candidates.find((selector) => {
+    const el = document.querySelector(selector);
+    return el && el.getClientRects().length > 0;
+}) || null
+"""
+
+
+class SelectorRegistry:
+    """Candidate selectors per field, with the winners remembered across runs
+
+    Counts hits, misses and lookup time per selector, and warns when a card
+    field's fill rate drops well below what earlier runs saw - the sign of a
+    Maps class rename.
+    """
+
+    def __init__(self, path=None, candidates=CANDIDATES, min_samples=50, drop_ratio=0.5):
+        self.path = path
+        self.candidates = candidates
+        self.min_samples = min_samples
+        self.drop_ratio = drop_ratio
+        self.winners = {}
+        self.baseline = {}
+        self.hits = {}
+        self.misses = {}
+        self.seconds = {}
+        self.alerted = set()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    saved = json.load(f)
+                self.winners = saved.get("winners", {})
+                self.baseline = saved.get("fill_rates", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable selector cache {path}: {e}")
+
+    def ordered(self, field):
+        """Candidates for a field, last known winner first"""
+        candidates = list(self.candidates[field])
+        winner = self.winners.get(field)
+        if winner in candidates:
+            candidates.remove(winner)
+            candidates.insert(0, winner)
+        return candidates
+
+    def page_candidates(self, fields=CARD_FIELDS):
+        """Ordered candidates for the in-page card extractor"""
+        return {field: self.ordered(field) for field in fields}
+
+    def record(self, field, selector, seconds=0.0, count=1):
+        """Count a lookup: selector is the winner, or None for a miss"""
+        if selector:
+            key = (field, selector)
+            self.hits[key] = self.hits.get(key, 0) + count
+            self.seconds[key] = self.seconds.get(key, 0.0) + seconds
+            self.winners[field] = selector
+        else:
+            self.misses[field] = self.misses.get(field, 0) + count
+
+    def merge(self, stats):
+        """Add the per-card counts from the page ({field: {selector or "": count}}); return fields that alerted"""
+        for field, counts in stats.items():
+            best = max((item for item in counts.items() if item[0]), key=lambda item: item[1], default=None)
+            for selector, count in counts.items():
+                if selector and selector != (best and best[0]):
+                    self.record(field, selector, count=count)
+            if best:
+                self.record(field, best[0], count=best[1])  # last, so the most used selector is the winner
+            if counts.get(""):
+                self.record(field, None, count=counts[""])
+        return self.check_fill_rates()
+
+    def fill_rate(self, field):
+        """(share of lookups that found the field, number of lookups)"""
+        hits = sum(count for (f, _), count in self.hits.items() if f == field)
+        total = hits + self.misses.get(field, 0)
+        return (hits / total if total else None), total
+
+    def check_fill_rates(self):
+        """Warn once per field whose fill rate fell below drop_ratio x its rate in earlier runs"""
+        alerts = []
+        for field, previous in self.baseline.items():
+            if field in self.alerted or not previous:
+                continue
+            rate, samples = self.fill_rate(field)
+            if samples >= self.min_samples and rate < previous * self.drop_ratio:
+                self.alerted.add(field)
+                alerts.append(field)
+                print(f"🚨 Selector alert: '{field}' filled on {rate:.0%} of cards (earlier runs: {previous:.0%}). "
+                      f"Its selectors may be outdated: {', '.join(self.candidates[field])}")
+        return alerts
+
+    async def locate(self, page, field, state="visible", timeout=10000):
+        """Wait for any candidate of a page-level field at once; return (locator, selector) or (None, None)
+
+        A single wait covers every candidate, so dead selectors cost no timeouts.
+        """
+        candidates = self.ordered(field)
+        started = time.perf_counter()
+        try:
+            await page.locator(", ".join(candidates)).first.wait_for(state=state, timeout=timeout)
+            selector = await page.evaluate(PICK_VISIBLE_JS, candidates) or candidates[0]
+        except Exception:
+            self.record(field, None)
+            return None, None
+        self.record(field, selector, time.perf_counter() - started)
+        return page.locator(selector).first, selector
+
+    def save(self):
+        """Persist the winners and the fill rates (blended with earlier runs) for the next run"""
+        if not self.path:
+            return
+        fill_rates = dict(self.baseline)
+        for field in self.candidates:
+            rate, samples = self.fill_rate(field)
+            if samples < self.min_samples or field in self.alerted:
+                continue  # too little data, or a collapse that should not become the new normal
+            previous = fill_rates.get(field)
+            fill_rates[field] = round(rate if previous is None else 0.7 * previous + 0.3 * rate, 4)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"winners": self.winners, "fill_rates": fill_rates}, f, indent=2)
+
+    def stats(self):
+        """Rows of (field, selector, hits, average ms); selector None holds the misses"""
+        rows = [
+            (field, selector, hits, self.seconds.get((field, selector), 0.0) / hits * 1000)
+            for (field, selector), hits in sorted(self.hits.items())
+        ]
+        rows.extend((field, None, misses, 0.0) for field, misses in sorted(self.misses.items()))
+        return rows
+
+    def summary(self):
+        parts = []
+        for field in self.candidates:
+            rate, samples = self.fill_rate(field)
+            if samples:
+                parts.append(f"{field} {rate:.0%} via {self.winners.get(field, '-')}")
+        return "Selectors: " + ("; ".join(parts) if parts else "no lookups")
@@ -0,0 +1,313 @@
+import csv
+import os
+import sqlite3
+import time
+
+from records import COLUMNS, FIELDS, Record, as_row, export_value
+from dedup import DedupIndex, exact_keys
+
+# Columns added after the first release, created on older databases by _migrate
+ADDED_COLUMNS = {
+    "hours": "TEXT", "latitude": "REAL", "longitude": "REAL", "place_url": "TEXT", "place_key": "TEXT",
+    "written": "INTEGER DEFAULT 1", "writer_id": "TEXT",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    url_key TEXT UNIQUE,
+    name_address_key TEXT UNIQUE,
+    name TEXT,
+    category TEXT,
+    address TEXT,
+    phone TEXT,
+    url TEXT,
+    rating TEXT,
+    reviews TEXT,
+    location TEXT,
+    hours TEXT,
+    latitude REAL,
+    longitude REAL,
+    place_url TEXT,
+    place_key TEXT,
+    query TEXT,
+    scraped_at TEXT,
+    written INTEGER DEFAULT 1,
+    writer_id TEXT
+);
+CREATE TABLE IF NOT EXISTS writers (
+    worker_id TEXT PRIMARY KEY,
+    heartbeat_at REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    query TEXT PRIMARY KEY,
+    depth INTEGER,
+    added INTEGER,
+    finished INTEGER DEFAULT 0,
+    last_batch_at TEXT
+);
+CREATE TABLE IF NOT EXISTS checkpoint_cards (
+    query TEXT,
+    card_key TEXT,
+    PRIMARY KEY (query, card_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imports (
+    path TEXT PRIMARY KEY,
+    header TEXT,
+    position INTEGER
+);
+"""
+
+
+# Records due for a refresh: an old (or unknown) "Scraped at". Stored times are
+# "YYYY-MM-DD HH:MM:SS" text, so they compare in time order.
+STALE = "(scraped_at < ? OR scraped_at IS NULL OR scraped_at = 'N/A')"
+# Stale records with a place page to open; the others (e.g. rows from before the
+# "Place URL" column) can only be found again by searching their name
+HAS_PLACE = "place_url LIKE 'http%'"
+SEARCHABLE = f"(NOT {HAS_PLACE} OR place_url IS NULL) AND name IS NOT NULL AND name != 'N/A'"
+
+
+def _values(record):
+    # Stored in export form, like the rows imported from the CSV
+    row = as_row(record)
+    return [row.get(column) for column in COLUMNS]
+
+
+class RecordStore:
+    """SQLite-backed record store; duplicates are caught by its DedupIndex and unique keys
+
+    url_key is only set on rows written before the dedup index existed - a shared
+    website no longer makes chain branches duplicates.
+    """
+
+    def __init__(self, path, dedup_log=None, worker_id=None):
+        self.path = path
+        # Owner of the unwritten rows this process adds (see unwritten_records)
+        self.worker_id = worker_id
+        # Several processes on this host may share one store (see config.QUEUE_PATH); wait out their
+        # write locks. WAL needs shared memory, so the file must be on a local disk.
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.dedup = DedupIndex(self.conn, dedup_log)
+        self.dedup.index_new_records()
+        self.conn.commit()
+
+    def _migrate(self):
+        existing = {row[1] for row in self.conn.execute("PRAGMA table_info(records)")}
+        for column, kind in ADDED_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE records ADD COLUMN {column} {kind}")
+        self.conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS records_place_key ON records (place_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS records_unwritten ON records (id) WHERE written = 0")
+
+    def add(self, record):
+        """Insert an output record unless it duplicates a stored one; return its row id if it was new
+
+        The record counts as unwritten until mark_written() confirms it reached the output files.
+        """
+        match = self.dedup.find_duplicate(record)
+        if match:
+            self.dedup.report(record, match)
+            return None
+        added = self._insert([record], written=False)
+        if not added:
+            self.dedup.report(record, (None, "exact name + address", 1.0))
+            return None
+        record_id = self.conn.execute(
+            "SELECT id FROM records WHERE name_address_key = ?", (exact_keys(record)[0],)
+        ).fetchone()[0]
+        self.dedup.index_new_records()
+        self.conn.commit()
+        return record_id
+
+    def update(self, record_id, record):
+        """Overwrite a stored record's fields and rebuild its dedup keys from them
+
+        A unique key that another row already holds is left as inserted.
+        """
+        self.conn.execute(
+            f"UPDATE records SET {', '.join(f'{field} = ?' for field in FIELDS)} WHERE id = ?",
+            _values(record) + [record_id],
+        )
+        name_address_key, key = exact_keys(record)
+        self.conn.execute("UPDATE OR IGNORE records SET name_address_key = ? WHERE id = ?", (name_address_key, record_id))
+        self.conn.execute("UPDATE OR IGNORE records SET place_key = ? WHERE id = ?", (key, record_id))
+        self.dedup.reindex(record_id)
+        self.conn.commit()
+
+    def contains(self, record):
+        """Return True if the record duplicates a stored one"""
+        return self.dedup.find_duplicate(record) is not None
+
+    def mark_written(self, ids):
+        """Record that these rows are safely in the output files"""
+        self.conn.executemany("UPDATE records SET written = 1 WHERE id = ?", [(record_id,) for record_id in ids])
+        self.conn.commit()
+
+    def heartbeat(self):
+        """Tell processes sharing the store that this worker is alive and still owns its unwritten rows"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO writers (worker_id, heartbeat_at) VALUES (?, ?)", (self.worker_id, time.time())
+        )
+        self.conn.commit()
+
+    def unwritten_records(self, stale_after, include_own=False):
+        """Take over and return (id, Record) pairs stored but never written out by a worker that died
+
+        A worker counts as dead once its heartbeat is older than stale_after seconds.
+        Rows of live workers sharing the store are theirs to write; this worker's own
+        rows are only included on startup (include_own), when none can still be queued.
+        """
+        self.conn.commit()
+        self.conn.execute("BEGIN IMMEDIATE")  # two workers never take over the same rows
+        try:
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(FIELDS)} FROM records WHERE written = 0 AND (writer_id IS NULL OR "
+                "(writer_id = ? AND ?) OR (writer_id != ? AND writer_id NOT IN "
+                "(SELECT worker_id FROM writers WHERE heartbeat_at > ?))) ORDER BY id",
+                (self.worker_id, int(include_own), self.worker_id, time.time() - stale_after),
+            ).fetchall()
+            self.conn.executemany("UPDATE records SET writer_id = ? WHERE id = ?", [(self.worker_id, row[0]) for row in rows])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return [(row[0], Record(**dict(zip(FIELDS, row[1:])))) for row in rows]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def records_by_id(self, ids, batch_size=900):
+        """Yield the stored records with these ids as typed Records"""
+        for start in range(0, len(ids), batch_size):
+            chunk = list(ids[start:start + batch_size])
+            rows = self.conn.execute(
+                f"SELECT {', '.join(FIELDS)} FROM records WHERE id IN ({', '.join('?' for _ in chunk)}) ORDER BY id",
+                chunk,
+            )
+            for row in rows:
+                yield Record(**dict(zip(FIELDS, row)))
+
+    def count_stale(self, cutoff):
+        """(with a place page, without one but with a name, neither) counts of records scraped before cutoff"""
+        row = self.conn.execute(
+            f"SELECT COALESCE(SUM({HAS_PLACE}), 0), COALESCE(SUM({SEARCHABLE}), 0), COUNT(*) FROM records WHERE {STALE}",
+            (export_value("scraped_at", cutoff),),
+        ).fetchone()
+        return row[0], row[1], row[2] - row[0] - row[1]
+
+    def stale_records(self, cutoff, after_id=0, limit=500, searchable=False):
+        """Next batch of (id, Record) pairs scraped before cutoff, in id order after after_id
+
+        Only records with a place page, unless searchable also asks for those without one.
+        """
+        which = f"({HAS_PLACE} OR {SEARCHABLE})" if searchable else HAS_PLACE
+        rows = self.conn.execute(
+            f"SELECT id, {', '.join(FIELDS)} FROM records WHERE id > ? AND {STALE} AND {which} ORDER BY id LIMIT ?",
+            (after_id, export_value("scraped_at", cutoff), limit),
+        )
+        return [(row[0], Record(**dict(zip(FIELDS, row[1:])))) for row in rows]
+
+    def import_csv(self, path, batch_size=1000):
+        """Import the output CSV rows appended since the last import; return the number of new records"""
+        if not os.path.exists(path):
+            return 0
+
+        added = 0
+        with open(path, "rb") as f:
+            header_line = f.readline().decode("utf-8-sig")
+            header = next(csv.reader([header_line]), [])
+            position = f.tell()
+
+            # Resume after the last imported row unless the file was rewritten since
+            row = self.conn.execute("SELECT header, position FROM imports WHERE path = ?", (path,)).fetchone()
+            if row and row[0] == header_line and row[1] <= os.path.getsize(path):
+                position = row[1]
+                f.seek(position)
+
+            def lines():
+                nonlocal position
+                for line in iter(f.readline, b""):
+                    if not line.endswith(b"\n"):
+                        return  # row still being written
+                    position = f.tell()
+                    yield line.decode("utf-8")
+
+            batch = []
+            for values in csv.reader(lines()):
+                row = dict(zip(header, values))
+                batch.append({column: row.get(column) or "N/A" for column in COLUMNS})
+                if len(batch) >= batch_size:
+                    added += self._insert(batch)
+                    self.dedup.index_new_records()
+                    self._save_position(path, header_line, position)
+                    batch = []
+            added += self._insert(batch)
+            self.dedup.index_new_records()
+            self._save_position(path, header_line, position)
+        return added
+
+    def _save_position(self, path, header_line, position):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO imports (path, header, position) VALUES (?, ?, ?)",
+            (path, header_line, position),
+        )
+        self.conn.commit()
+
+    def _insert(self, records, written=True):
+        keys = [exact_keys(r) for r in records]
+        before = self.conn.total_changes
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO records (name_address_key, place_key, written, writer_id, {', '.join(FIELDS)}) "
+            f"VALUES (?, ?, ?, ?, {', '.join('?' for _ in FIELDS)})",
+            [list(key) + [int(written), None if written else self.worker_id] + _values(r) for key, r in zip(keys, records)],
+        )
+        added = self.conn.total_changes - before
+        if written:
+            # Rows found in the output file were written even if the run that stored them never confirmed it
+            self.conn.executemany(
+                "UPDATE records SET written = 1 WHERE name_address_key = ? AND written = 0", [(key[0],) for key in keys]
+            )
+        return added
+
+    def load_checkpoint(self, query):
+        """Return the saved progress of a query, or None if it has none"""
+        row = self.conn.execute(
+            "SELECT depth, added, finished, last_batch_at, (julianday('now') - julianday(last_batch_at)) * 86400 "
+            "FROM checkpoints WHERE query = ?", (query,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = {key for (key,) in self.conn.execute(
+            "SELECT card_key FROM checkpoint_cards WHERE query = ?", (query,)
+        )}
+        return {"depth": row[0], "added": row[1], "finished": bool(row[2]), "last_batch_at": row[3],
+                "age": row[4] or 0.0, "keys": keys}
+
+    def save_checkpoint(self, query, card_keys, depth, added, finished=False):
+        """Record the cards processed in the last batch and how far the feed was scrolled"""
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO checkpoint_cards (query, card_key) VALUES (?, ?)",
+            [(query, key) for key in card_keys],
+        )
+        self.conn.execute(
+            "INSERT INTO checkpoints (query, depth, added, finished, last_batch_at) "
+            "VALUES (?, ?, ?, ?, datetime('now')) "
+            "ON CONFLICT(query) DO UPDATE SET depth = MAX(depth, excluded.depth), added = excluded.added, "
+            "finished = excluded.finished, last_batch_at = excluded.last_batch_at",
+            (query, depth, added, int(finished)),
+        )
+        self.conn.commit()
+
+    def clear_checkpoint(self, query):
+        """Forget a query's progress so it starts from the top"""
+        self.conn.execute("DELETE FROM checkpoints WHERE query = ?", (query,))
+        self.conn.execute("DELETE FROM checkpoint_cards WHERE query = ?", (query,))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
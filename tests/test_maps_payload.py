@@ -0,0 +1,50 @@
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import maps_payload
+
+SYNTHETIC = os.path.join(maps_payload.FIXTURES_DIR, "synthetic_search.txt")
+
+
+@pytest.mark.parametrize("path", maps_payload.fixtures(), ids=os.path.basename)
+def test_fixture_decodes_to_expected_records(path):
+    assert maps_payload.check(path)
+
+
+def test_synthetic_fixture_covers_wrapper_guard_and_fallback_paths():
+    with open(SYNTHETIC, encoding="utf-8") as f:
+        text = f.read().strip()
+    assert text.endswith('/*""*/')
+    inner = json.loads(text[:-len('/*""*/')])["d"]
+    assert inner.startswith(maps_payload.XSSI_PREFIX)
+
+    full, fallback = maps_payload.parse_search_payload(text)
+    assert full["address"] == "12, Jalan Ampang, 50450 Kuala Lumpur"  # path (39,)
+    assert full["reviews"] == "1,234"
+    assert fallback["address"] == "8 Jalan SS2/24, 47300 Petaling Jaya"  # list at (2,)
+    assert fallback["phone"] == "03-7876 5432"  # (3, 0)
+    assert fallback["url"] == "N/A"
+
+
+def test_check_reports_a_changed_field(tmp_path):
+    path = tmp_path / "search.txt"
+    shutil.copy(SYNTHETIC, path)
+    with open(maps_payload.expected_path(SYNTHETIC), encoding="utf-8") as f:
+        expected = json.load(f)
+    expected[0]["rating"] = "4.9"
+    with open(maps_payload.expected_path(str(path)), "w", encoding="utf-8") as f:
+        json.dump(expected, f)
+
+    with pytest.raises(maps_payload.PayloadMismatch, match="rating"):
+        maps_payload.check(str(path))
+
+
+def test_unparseable_body_gives_no_records():
+    assert maps_payload.parse_search_payload(")]}'\nnot json") == []
+    assert maps_payload.parse_search_payload("") == []
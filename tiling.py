@@ -0,0 +1,67 @@
+import math
+from collections import namedtuple
+from urllib.parse import quote_plus
+
+# A map rectangle in degrees; depth counts how many times it was subdivided
+Tile = namedtuple("Tile", ["south", "west", "north", "east", "depth"])
+
+# Approximate width in pixels of the map area next to the results panel
+VIEWPORT_WIDTH_PX = 1000
+
+
+def resolve_area(area, areas):
+    """Return the (south, west, north, east) box for an area name or an explicit box"""
+    if isinstance(area, str):
+        if area not in areas:
+            raise ValueError(f"Unknown tile area '{area}'; add its bounding box to TILE_AREAS")
+        area = areas[area]
+    south, west, north, east = area
+    if south >= north or west >= east:
+        raise ValueError(f"Invalid bounding box: {area}")
+    return south, west, north, east
+
+
+def grid(box, rows, cols):
+    """Split a bounding box into rows x cols tiles"""
+    south, west, north, east = box
+    lat_step = (north - south) / rows
+    lng_step = (east - west) / cols
+    return [
+        Tile(south + r * lat_step, west + c * lng_step, south + (r + 1) * lat_step, west + (c + 1) * lng_step, 0)
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def subdivide(tile):
+    """Split a tile into four quadrants one level deeper"""
+    mid_lat = (tile.south + tile.north) / 2
+    mid_lng = (tile.west + tile.east) / 2
+    depth = tile.depth + 1
+    return [
+        Tile(tile.south, tile.west, mid_lat, mid_lng, depth),
+        Tile(tile.south, mid_lng, mid_lat, tile.east, depth),
+        Tile(mid_lat, tile.west, tile.north, mid_lng, depth),
+        Tile(mid_lat, mid_lng, tile.north, tile.east, depth),
+    ]
+
+
+def center(tile):
+    return (tile.south + tile.north) / 2, (tile.west + tile.east) / 2
+
+
+def zoom_for(tile):
+    """Zoom level at which the tile's width fills the map viewport"""
+    span = max(tile.east - tile.west, 1e-6)
+    zoom = math.log2(360 * VIEWPORT_WIDTH_PX / (256 * span))
+    return max(3, min(21, int(zoom)))
+
+
+def label(tile):
+    lat, lng = center(tile)
+    return f"@{lat:.5f},{lng:.5f},{zoom_for(tile)}z"
+
+
+def tile_url(base_url, query, tile):
+    """Viewport-scoped search URL for a query inside one tile"""
+    return f"{base_url}/search/{quote_plus(query)}/{label(tile)}"
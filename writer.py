@@ -0,0 +1,153 @@
+import asyncio
+import csv
+import json
+import os
+
+# Output columns are defined with the record model; re-exported for existing imports
+from records import COLUMNS, as_row
+
+
+class RecordWriter:
+    """Append new records to CSV/JSONL from a background task"""
+
+    def __init__(self, csv_path, jsonl_path=None, flush_interval=5, on_written=None):
+        self.csv_path = csv_path
+        self.jsonl_path = jsonl_path
+        self.flush_interval = flush_interval
+        self.on_written = on_written
+        self.pending = []
+        self.pending_ids = []
+        self.written = 0
+        self._csv_file = None
+        self._csv_writer = None
+        self._jsonl_file = None
+        self._task = None
+        self._lock = None
+
+    def write(self, record, record_id=None):
+        """Queue a record; it reaches disk on the next flush, after which record_id goes to on_written"""
+        self.pending.append(record)
+        if record_id is not None:
+            self.pending_ids.append(record_id)
+
+    def start(self):
+        """Start the periodic flush task on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Error writing records: {e}")
+
+    async def flush(self):
+        """Write queued records and fsync, without blocking the event loop"""
+        if not self.pending:
+            return
+        rows, self.pending = self.pending, []
+        ids, self.pending_ids = self.pending_ids, []
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await asyncio.to_thread(self._write_rows, rows)
+        self._confirm(ids)
+
+    def flush_sync(self):
+        """Write queued records from outside the event loop (e.g. on Ctrl+C)"""
+        rows, self.pending = self.pending, []
+        ids, self.pending_ids = self.pending_ids, []
+        if rows:
+            self._write_rows(rows)
+            self._confirm(ids)
+
+    def _confirm(self, ids):
+        # Only after the fsync: ids never confirmed are re-exported on the next start
+        if ids and self.on_written:
+            self.on_written(ids)
+
+    async def close(self):
+        """Stop the flush task and write whatever is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        self._close_files()
+
+    def _open(self):
+        if self._csv_file is None:
+            self._upgrade_csv_header()
+            is_new = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+            # Only a brand-new file gets the BOM, so Excel still detects UTF-8
+            self._csv_file = open(self.csv_path, "a", newline="", encoding="utf-8-sig" if is_new else "utf-8")
+            self._csv_writer = csv.DictWriter(self._csv_file, fieldnames=COLUMNS, extrasaction="ignore")
+            if is_new:
+                self._csv_writer.writeheader()
+        if self.jsonl_path and self._jsonl_file is None:
+            self._jsonl_file = open(self.jsonl_path, "a", encoding="utf-8")
+
+    def _upgrade_csv_header(self):
+        """Rewrite an existing CSV once if it was written with older columns"""
+        if not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0:
+            return
+        with open(self.csv_path, newline="", encoding="utf-8-sig") as f:
+            header = next(csv.reader(f), [])
+        if header == COLUMNS:
+            return
+
+        print(f"Upgrading columns of {self.csv_path}")
+        tmp_path = self.csv_path + ".tmp"
+        with open(self.csv_path, newline="", encoding="utf-8-sig") as src, \
+                open(tmp_path, "w", newline="", encoding="utf-8-sig") as dst:
+            writer = csv.DictWriter(dst, fieldnames=COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for row in csv.DictReader(src):
+                writer.writerow(row)
+        os.replace(tmp_path, self.csv_path)
+
+    def _write_rows(self, records):
+        # Column names and text formatting are applied only here, at export
+        rows = [as_row(record) for record in records]
+        self._open()
+        self._csv_writer.writerows(rows)
+        self._sync(self._csv_file)
+        if self._jsonl_file:
+            for row in rows:
+                self._jsonl_file.write(json.dumps(row, ensure_ascii=False) + "\n")
+            self._sync(self._jsonl_file)
+        self.written += len(rows)
+
+    @staticmethod
+    def _sync(f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _close_files(self):
+        for f in (self._csv_file, self._jsonl_file):
+            if f:
+                f.close()
+        self._csv_file = self._csv_writer = self._jsonl_file = None
+
+    def export_excel_sync(self, excel_path):
+        """Build the Excel file from the CSV in one pass"""
+        if not os.path.exists(self.csv_path):
+            print("No data to save")
+            return
+        # pandas/openpyxl are only needed here, so they are not imported at startup
+        import pandas as pd
+        df = pd.read_csv(self.csv_path, encoding="utf-8-sig")
+        df.to_excel(excel_path, index=False)
+        print(f"✅ Data saved to {excel_path}")
+
+    async def export_excel(self, excel_path):
+        """Export the Excel file on a worker thread"""
+        try:
+            await asyncio.to_thread(self.export_excel_sync, excel_path)
+        except Exception as e:
+            print(f"Error saving Excel: {e}")